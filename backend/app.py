@@ -1,45 +1,128 @@
-import numpy as np
-import tensorflow as tf
-from PIL import Image
-import io
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+import inference
+import metrics
+import tensor_payload
+from inference import label, predict_image, predict_images, predict_pixels
+from uploads import (MAX_BATCH_FILES, MAX_BATCH_REQUEST_BYTES, MAX_REQUEST_BYTES, MAX_UPLOAD_BYTES,
+                     UploadRejected, read_archive, read_upload)
 
-app = Flask(__name__)
-CORS(app, origins=["http://localhost:5173", "https://duo-or-not.vercel.app"])
 
-IMG_SIZE = (224, 224)
+class UploadRequest(Request):
+    """A request whose body limit depends on the route: one image, or a whole batch."""
+
+    @property
+    def max_content_length(self):
+        return MAX_BATCH_REQUEST_BYTES if self.path == "/predict/batch" else super().max_content_length
+
 
-# Load the TFLite model
-interpreter = tf.lite.Interpreter(model_path="duolingo_detector.tflite")
-interpreter.allocate_tensors()
-input_index = interpreter.get_input_details()[0]["index"]
-output_index = interpreter.get_output_details()[0]["index"]
-print("✅ TFLite model loaded")
+app = Flask(__name__)
+app.request_class = UploadRequest
+# Werkzeug stops reading the body past this many bytes, with or without a
+# Content-Length, before the multipart form is buffered
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+CORS(app, origins=["http://localhost:5173", "https://duo-or-not.vercel.app"])
 
-def preprocess(img_bytes):
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    img = img.resize(IMG_SIZE)
-    img_array = np.array(img, dtype=np.float32) / 127.5 - 1  # MobileNetV2 preprocessing
-    return np.expand_dims(img_array, axis=0)
+@app.errorhandler(RequestEntityTooLarge)
+def too_large(e):
+    metrics.record_error("too_large")
+    if request.path == "/predict/batch":
+        return jsonify({"error": f"Request is larger than {MAX_BATCH_REQUEST_BYTES} bytes"}), 413
+    return jsonify({"error": f"Image is larger than {MAX_UPLOAD_BYTES} bytes"}), 413
 
 @app.route("/predict", methods=["POST"])
 def predict():
+    if request.mimetype == tensor_payload.CONTENT_TYPE:
+        return predict_tensor()
     if "image" not in request.files:
+        metrics.record_error("no_image")
         return jsonify({"error": "No image uploaded"}), 400
 
-    img_bytes = request.files["image"].read()
-    input_tensor = preprocess(img_bytes)
+    try:
+        with metrics.timed("upload_read"):
+            img_bytes = read_upload(request.files["image"].stream)
+    except UploadRejected as e:
+        metrics.record_error("rejected")
+        return jsonify({"error": str(e)}), e.status
+
+    try:
+        pred = predict_image(img_bytes)
+    except (OSError, SyntaxError, ValueError) as e:
+        metrics.record_error("decode")
+        return jsonify({"error": f"Could not decode image: {e}"}), 400
+
+    with metrics.timed("serialize"):
+        return jsonify({
+            "prediction": label(pred),
+            "confidence": float(pred)
+        })
+
+def predict_tensor():
+    # The body is a pre-resized tensor payload (see tensor_payload.py), so there is nothing to decode
+    try:
+        with metrics.timed("upload_read"):
+            pixels = tensor_payload.read_payload(request.stream)
+    except UploadRejected as e:
+        metrics.record_error("rejected")
+        return jsonify({"error": str(e)}), e.status
+
+    pred = predict_pixels(pixels)
+    with metrics.timed("serialize"):
+        return jsonify({
+            "prediction": label(pred),
+            "confidence": float(pred)
+        })
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    # Either any number of "images" files, or one zip/tar "archive" of images.
+    # Each entry holds the image bytes, or the UploadRejected explaining why not.
+    uploads = []
+    with metrics.timed("upload_read"):
+        for file in request.files.getlist("images"):
+            try:
+                uploads.append((file.filename, read_upload(file.stream)))
+            except UploadRejected as e:
+                uploads.append((file.filename, e))
+        if "archive" in request.files:
+            try:
+                # Only as many archive images as the batch still has room for
+                uploads.extend(read_archive(request.files["archive"].stream, MAX_BATCH_FILES - len(uploads)))
+            except UploadRejected as e:
+                metrics.record_error("rejected")
+                return jsonify({"error": str(e)}), e.status
+
+    if not uploads:
+        return jsonify({"error": "No images uploaded"}), 400
+    if len(uploads) > MAX_BATCH_FILES:
+        return jsonify({"error": f"Too many images (max {MAX_BATCH_FILES})"}), 413
+
+    readable = [i for i, (_, img_bytes) in enumerate(uploads) if isinstance(img_bytes, bytes)]
+    confidences = dict(zip(readable, predict_images([uploads[i][1] for i in readable])))
+
+    results = []
+    for i, (name, img_bytes) in enumerate(uploads):
+        confidence = confidences.get(i)
+        if isinstance(img_bytes, UploadRejected):
+            metrics.record_error("rejected")
+            results.append({"filename": name, "error": str(img_bytes)})
+        elif isinstance(confidence, Exception):
+            results.append({"filename": name, "error": f"Could not decode image: {confidence}"})
+        else:
+            results.append({"filename": name, "prediction": label(confidence), "confidence": confidence})
+
+    with metrics.timed("serialize"):
+        return jsonify({"results": results})
 
-    # Run inference with TFLite
-    interpreter.set_tensor(input_index, input_tensor)
-    interpreter.invoke()
-    pred = interpreter.get_tensor(output_index)[0][0]
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify(inference.stats())
 
-    return jsonify({
-        "prediction": "duolingo" if pred > 0.5 else "not_duolingo",
-        "confidence": float(pred)
-    })
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=10000)
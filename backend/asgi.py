@@ -0,0 +1,108 @@
+"""
+ASGI entry point serving the same /predict contract as app.py.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 10000
+
+Uploads are received on the event loop, so a slow client only costs a
+coroutine rather than a worker. Decoding and inference run on a bounded
+executor; once MAX_IN_FLIGHT requests are being handled, new ones get a 503
+before any of their body is read instead of piling up behind them.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+import inference
+import metrics
+import tensor_payload
+from inference import label, predict_image, predict_pixels
+from uploads import MAX_REQUEST_BYTES, MAX_UPLOAD_BYTES, UploadRejected, read_upload_async
+
+MAX_IN_FLIGHT = int(os.environ.get("MAX_IN_FLIGHT", "32"))
+
+executor = ThreadPoolExecutor(MAX_IN_FLIGHT, thread_name_prefix="predict")
+in_flight = 0  # Only touched on the event loop, so no lock is needed
+
+async def predict(request):
+    global in_flight
+    # Refuse oversized bodies from Content-Length before anything is read
+    content_length = int(request.headers.get("content-length", 0))
+    if content_length > MAX_REQUEST_BYTES:
+        metrics.record_error("too_large")
+        return JSONResponse({"error": f"Image is larger than {MAX_UPLOAD_BYTES} bytes"}, status_code=413)
+
+    # Counted from arrival, so uploads still being received hold a slot too
+    if in_flight >= MAX_IN_FLIGHT:
+        metrics.record_error("busy")
+        return JSONResponse({"error": "Server is busy, try again shortly"}, status_code=503,
+                            headers={"Retry-After": "1"})
+
+    in_flight += 1
+    try:
+        return await _predict(request)
+    finally:
+        in_flight -= 1
+
+async def _predict(request):
+    if request.headers.get("content-type", "").split(";")[0].strip() == tensor_payload.CONTENT_TYPE:
+        # A pre-resized tensor payload (see tensor_payload.py): no form to parse and nothing to decode.
+        # The reader bounds the body itself, so chunked uploads are fine here.
+        try:
+            with metrics.timed("upload_read"):
+                pixels = await tensor_payload.read_payload_async(request.stream())
+        except UploadRejected as e:
+            metrics.record_error("rejected")
+            return JSONResponse({"error": str(e)}, status_code=e.status)
+        task = (predict_pixels, pixels)
+    else:
+        # request.form() buffers the whole multipart body before read_upload_async sees
+        # it, so only a declared Content-Length bounds it
+        if "content-length" not in request.headers:
+            metrics.record_error("no_length")
+            return JSONResponse({"error": "Content-Length is required for multipart uploads"}, status_code=411)
+        async with request.form() as form:
+            upload = form.get("image")
+            if upload is None or isinstance(upload, str):
+                metrics.record_error("no_image")
+                return JSONResponse({"error": "No image uploaded"}, status_code=400)
+            try:
+                with metrics.timed("upload_read"):
+                    img_bytes = await read_upload_async(upload)
+            except UploadRejected as e:
+                metrics.record_error("rejected")
+                return JSONResponse({"error": str(e)}, status_code=e.status)
+        task = (predict_image, img_bytes)
+
+    try:
+        pred = await asyncio.get_running_loop().run_in_executor(executor, *task)
+    except (OSError, SyntaxError, ValueError) as e:
+        metrics.record_error("decode")
+        return JSONResponse({"error": f"Could not decode image: {e}"}, status_code=400)
+
+    with metrics.timed("serialize"):
+        return JSONResponse({
+            "prediction": label(pred),
+            "confidence": float(pred)
+        })
+
+async def stats(request):
+    return JSONResponse({**inference.stats(), "in_flight": in_flight, "max_in_flight": MAX_IN_FLIGHT})
+
+async def metrics_endpoint(request):
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+app = Starlette(
+    routes=[
+        Route("/predict", predict, methods=["POST"]),
+        Route("/stats", stats, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["http://localhost:5173", "https://duo-or-not.vercel.app"]),
+    ],
+)
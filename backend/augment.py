@@ -1,6 +1,10 @@
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import ssl
+import numpy as np
 from albumentations import (
     Compose, HorizontalFlip, RandomRotate90,
     RandomBrightnessContrast, HueSaturationValue,
@@ -14,79 +18,196 @@ from multiprocessing import Pool, cpu_count
 # Fix SSL certificate issue on Mac
 ssl._create_default_https_context = ssl._create_unverified_context
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp')
+IMAGE_SIZE = (224, 224)
+
+def build_pipeline():
+    """The albumentations pipeline shared by streaming and materialized augmentation."""
+    return Compose([
+        # Geometric transformations
+        HorizontalFlip(p=0.5),
+        RandomRotate90(p=0.3),
+        ShiftScaleRotate(
+            shift_limit=0.05,
+            scale_limit=0.1,
+            rotate_limit=30,
+            p=0.5
+        ),
+
+        # Color transformations
+        RandomBrightnessContrast(brightness_limit=0.2, contrast_limit=0.2, p=0.5),
+        HueSaturationValue(hue_shift_limit=10, sat_shift_limit=20, val_shift_limit=20, p=0.5),
+
+        # Mild blur/noise for robustness
+        OneOf([
+            GaussianBlur(blur_limit=3, p=0.5),
+            MotionBlur(blur_limit=3, p=0.5),
+        ], p=0.3),
+
+        # Optional: mild noise
+        ISONoise(p=0.2),
+    ], p=1.0)
+
+# Each worker (process or thread) builds its own pipeline once, in the pool
+# initializer, so nothing but paths and seeds is sent with each task
+_worker = threading.local()
+
+def _init_worker():
+    _worker.pipeline = build_pipeline()
+
+def sample_seed(*parts):
+    """A 32-bit seed derived from e.g. (base seed, epoch, image index), the same on every run."""
+    return int(np.random.SeedSequence(list(parts)).generate_state(1)[0])
+
+def _augment(image, seed):
+    # Each pipeline keeps its own generators, so workers seed and augment independently
+    pipeline = _worker.pipeline
+    pipeline.set_random_seed(seed)
+    return pipeline(image=image)["image"]
+
+def _read_rgb(image_path):
+    image = cv2.imread(image_path)
+    if image is None:
+        return None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def _augment_chunk(tasks):
+    """[(path, seed)] -> ([uint8 (224, 224, 3) images], [index of each image within tasks])."""
+    images, kept = [], []
+    for i, (image_path, seed) in enumerate(tasks):
+        try:
+            image = _read_rgb(image_path)
+            if image is None:
+                continue
+            augmented = _augment(image, seed)
+            if augmented.shape[:2] != IMAGE_SIZE:
+                augmented = cv2.resize(augmented, IMAGE_SIZE, interpolation=cv2.INTER_LINEAR)
+            images.append(augmented)
+            kept.append(i)
+        except Exception as e:
+            print(f"Error processing {image_path}: {e}")
+    return images, kept
+
+def _write_chunk(tasks):
+    """[(path, [(output path, seed)])] -> number of augmented images written."""
+    written = 0
+    for image_path, outputs in tasks:
+        try:
+            image = _read_rgb(image_path)
+            if image is None:
+                continue
+            for output_path, seed in outputs:
+                # Convert back to BGR for saving
+                cv2.imwrite(output_path, cv2.cvtColor(_augment(image, seed), cv2.COLOR_RGB2BGR))
+                written += 1
+        except Exception as e:
+            print(f"Error processing {image_path}: {e}")
+    return written
+
+
+class AugmentedStream:
+    """
+    Augments training images on the fly instead of writing copies to disk.
+
+    Every epoch visits each image once, in a shuffled order, with a fresh
+    augmentation. Both the order and each image's augmentation are seeded
+    from (seed, epoch, index), so a run can be reproduced exactly.
+
+    Chunks are augmented by a pool of worker threads; OpenCV releases the GIL
+    in its image operations, and threads can be started safely from inside a
+    TensorFlow training process. At most `prefetch` chunks are in flight.
+
+    Args:
+        file_paths (list): Images to augment
+        labels (list): Label of each image
+        seed (int): Base seed
+        workers (int): Augmentation threads (default: one per core)
+        prefetch (int): Chunks augmented ahead of the consumer
+    """
+
+    def __init__(self, file_paths, labels, seed=0, workers=None, prefetch=4):
+        self.file_paths = list(file_paths)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.seed = seed
+        self.prefetch = max(1, prefetch)
+        self._executor = ThreadPoolExecutor(workers or os.cpu_count() or 1, thread_name_prefix="augment",
+                                            initializer=_init_worker)
+
+    def __len__(self):
+        return len(self.file_paths)
+
+    def epoch(self, epoch, batch_size=32):
+        """Yield (images, labels) batches of augmented uint8 images for one epoch."""
+        order = np.random.default_rng([self.seed, epoch]).permutation(len(self.file_paths))
+        chunks = (order[start:start + batch_size] for start in range(0, len(order), batch_size))
+
+        in_flight = deque()
+        for chunk in chunks:
+            tasks = [(self.file_paths[i], sample_seed(self.seed, epoch, i)) for i in chunk]
+            in_flight.append((chunk, self._executor.submit(_augment_chunk, tasks)))
+            if len(in_flight) >= self.prefetch:
+                yield from self._collect(*in_flight.popleft())
+        while in_flight:
+            yield from self._collect(*in_flight.popleft())
+
+    def _collect(self, chunk, future):
+        images, kept = future.result()
+        # A chunk whose images all failed to read yields nothing rather than an empty batch
+        if images:
+            yield np.stack(images), self.labels[chunk[kept]]
+
+    def as_tf_dataset(self, batch_size=32, shuffle=True, seed=None):
+        """
+        A tf.data pipeline yielding one epoch of augmented batches per pass.
+
+        Images come out as float32 in [0, 255], the same as
+        image_dataset_from_directory. The order is always shuffled; `seed`
+        replaces the stream's own seed when given.
+        """
+        import itertools
+        import tensorflow as tf
+
+        if seed is not None:
+            self.seed = seed
+        epochs = itertools.count()
+
+        def generator():
+            yield from self.epoch(next(epochs), batch_size)
+
+        ds = tf.data.Dataset.from_generator(generator, output_signature=(
+            tf.TensorSpec((None, *IMAGE_SIZE, 3), tf.uint8),
+            tf.TensorSpec((None,), tf.int32),
+        ))
+        ds = ds.map(lambda x, y: (tf.cast(x, tf.float32), y), num_parallel_calls=tf.data.AUTOTUNE)
+        return ds.prefetch(tf.data.AUTOTUNE)
+
+    def close(self):
+        self._executor.shutdown()
+
+
 class ImageAugmentor:
-    def __init__(self, input_folder, output_folder, augmentations_per_image=3):
+    """
+    Writes augmented copies of every image to disk, for when files are needed.
+
+    Work is sent to the process pool in chunks of images, and each process
+    builds the pipeline once in its initializer rather than receiving a
+    pickled augmentor with every task. Copies are seeded from (seed, image
+    index, copy number), so re-running produces the same files.
+    """
+
+    def __init__(self, input_folder, output_folder, augmentations_per_image=3, seed=0, chunk_size=16):
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.augmentations_per_image = augmentations_per_image
-        
+        self.seed = seed
+        self.chunk_size = chunk_size
+
         # Supported image extensions
-        self.image_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp')
-        
+        self.image_extensions = IMAGE_EXTENSIONS
+
         # Create output folder if it doesn't exist
         os.makedirs(self.output_folder, exist_ok=True)
-        
-        # Define our augmentation pipeline
-        self.augmentation_pipeline = Compose([
-            # Geometric transformations
-            HorizontalFlip(p=0.5),
-            RandomRotate90(p=0.3),
-            ShiftScaleRotate(
-                shift_limit=0.05, 
-                scale_limit=0.1, 
-                rotate_limit=30, 
-                p=0.5
-            ),
-            
-            # Color transformations
-            RandomBrightnessContrast(brightness_limit=0.2, contrast_limit=0.2, p=0.5),
-            HueSaturationValue(hue_shift_limit=10, sat_shift_limit=20, val_shift_limit=20, p=0.5),
-            
-            # Mild blur/noise for robustness
-            OneOf([
-                GaussianBlur(blur_limit=3, p=0.5),
-                MotionBlur(blur_limit=3, p=0.5),
-            ], p=0.3),
-            
-            # Optional: mild noise
-            ISONoise(p=0.2),
-        ], p=1.0)
-    
-    def augment_image(self, image_path):
-        try:
-            # Read image
-            image = cv2.imread(image_path)
-            if image is None:
-                return
-            
-            # Convert BGR to RGB
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Get base filename without extension
-            base_name = os.path.splitext(os.path.basename(image_path))[0]
-            
-            # Save original image to output folder (optional)
-            # output_path = os.path.join(self.output_folder, f"{base_name}_original.jpg")
-            # cv2.imwrite(output_path, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
-            
-            # Generate augmented versions
-            for i in range(self.augmentations_per_image):
-                augmented = self.augmentation_pipeline(image=image)
-                augmented_image = augmented["image"]
-                
-                # Convert back to BGR for saving
-                augmented_image_bgr = cv2.cvtColor(augmented_image, cv2.COLOR_RGB2BGR)
-                
-                # Save augmented image
-                output_path = os.path.join(
-                    self.output_folder, 
-                    f"{base_name}_aug_{i+1}.jpg"
-                )
-                cv2.imwrite(output_path, augmented_image_bgr)
-                
-        except Exception as e:
-            print(f"Error processing {image_path}: {e}")
-    
+
     def process_folder(self):
         # Get all image files in input folder
         image_files = []
@@ -94,17 +215,28 @@ class ImageAugmentor:
             for file in files:
                 if file.lower().endswith(self.image_extensions):
                     image_files.append(os.path.join(root, file))
-        
+        image_files.sort()
+
         print(f"Found {len(image_files)} images to augment.")
         print(f"Generating {self.augmentations_per_image} augmentations per image...")
-        
+
+        tasks = []
+        for index, image_path in enumerate(image_files):
+            # Get base filename without extension
+            base_name = os.path.splitext(os.path.basename(image_path))[0]
+            outputs = [(os.path.join(self.output_folder, f"{base_name}_aug_{i+1}.jpg"), sample_seed(self.seed, index, i))
+                       for i in range(self.augmentations_per_image)]
+            tasks.append((image_path, outputs))
+        chunks = [tasks[start:start + self.chunk_size] for start in range(0, len(tasks), self.chunk_size)]
+
         # Use multiprocessing to speed up augmentation
-        with Pool(processes=max(1, cpu_count() - 1)) as pool:
-            list(tqdm(
-                pool.imap(self.augment_image, image_files),
-                total=len(image_files),
-                desc="Augmenting images"
-            ))
+        written = 0
+        with Pool(processes=max(1, cpu_count() - 1), initializer=_init_worker) as pool:
+            with tqdm(total=len(image_files), desc="Augmenting images") as progress:
+                for chunk, count in zip(chunks, pool.imap(_write_chunk, chunks)):
+                    written += count
+                    progress.update(len(chunk))
+        return written
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Image Augmentation for Machine Learning')
@@ -112,20 +244,26 @@ if __name__ == "__main__":
     parser.add_argument('output_folder', help='Path to save augmented images')
     parser.add_argument('--augmentations', type=int, default=5,
                        help='Number of augmentations to generate per image (default: 5)')
-    
+    parser.add_argument('--seed', type=int, default=0, help='Base seed for reproducible augmentations (default: 0)')
+    parser.add_argument('--chunk-size', type=int, default=16,
+                       help='Images per task sent to each worker process (default: 16)')
+
     args = parser.parse_args()
-    
+
     # Verify input folder exists
     if not os.path.isdir(args.input_folder):
         print(f"Error: Input folder '{args.input_folder}' does not exist.")
         exit(1)
-    
+
     # Create augmentor and process
     augmentor = ImageAugmentor(
         input_folder=args.input_folder,
         output_folder=args.output_folder,
-        augmentations_per_image=args.augmentations
+        augmentations_per_image=args.augmentations,
+        seed=args.seed,
+        chunk_size=args.chunk_size
     )
-    augmentor.process_folder()
-    
-    print("\nImage augmentation completed successfully!")
+    written = augmentor.process_folder()
+
+    print(f"\nImage augmentation completed successfully! {written} images written.")
+    print("To augment during training instead, run classifier.py --augment")
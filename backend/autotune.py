@@ -0,0 +1,194 @@
+"""
+Find the fastest interpreter configuration for this machine and save it.
+
+Every combination of threads per interpreter, XNNPACK on/off and batch size
+is run the way the server runs it: cores // threads interpreters invoking
+concurrently, so configurations compete for the same cores they would in
+production. The configuration with the highest throughput whose median
+batch latency stays within --max-latency-ms wins, and is written to
+tuning.json together with the core count, backend and model it was measured
+on.
+
+inference.py takes its INTERPRETER_THREADS, INTERPRETER_POOL_SIZE,
+MAX_BATCH_SIZE and XNNPACK defaults from that file when it matches the
+current machine and model; environment variables still override it. With
+AUTOTUNE_ON_START=1 the server runs a short tuning pass itself when no
+matching file exists.
+
+Usage: python autotune.py [--model duolingo_detector.tflite] [--output tuning.json]
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+from decode import IMG_SIZE
+from interpreter_pool import InterpreterPool
+from tflite_backend import BACKEND
+
+DEFAULT_OUTPUT = "tuning.json"
+BATCH_SIZES = (1, 2, 4, 8, 16)
+
+def fingerprint(model_path):
+    """What a tuning result depends on: core count, interpreter package and model contents."""
+    with open(model_path, "rb") as f:
+        model_hash = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    return {"cpu_count": os.cpu_count() or 1, "backend": BACKEND, "model": model_hash}
+
+def thread_counts(cores):
+    """1, 2, 4, ... up to the core count, plus the core count itself."""
+    counts, n = [], 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    return counts + [cores]
+
+def measure(model_path, num_threads, xnnpack, batch_size, seconds, cores):
+    """Throughput and batch latency of cores // num_threads interpreters invoking concurrently."""
+    pool_size = max(1, cores // num_threads)
+    pool = InterpreterPool(model_path, pool_size, num_threads, xnnpack)
+    pool.load()
+    pixels = np.random.default_rng(0).integers(0, 256, (batch_size, *IMG_SIZE, 3), dtype=np.uint8)
+
+    latencies, rates, errors = [], [], []
+    lock = threading.Lock()
+    ready = threading.Barrier(pool_size)
+
+    def worker():
+        try:
+            with pool.checkout() as pooled:
+                # Allocate for this batch size, then start timing together
+                pooled.run(pixels)
+                ready.wait()
+                times = []
+                deadline = time.perf_counter() + seconds
+                while not times or time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    pooled.run(pixels)
+                    times.append(time.perf_counter() - start)
+        except Exception as e:
+            # Release the others from the barrier rather than leave them waiting
+            ready.abort()
+            with lock:
+                errors.append(e)
+            return
+        with lock:
+            latencies.extend(times)
+            rates.append(len(times) * batch_size / sum(times))
+
+    workers = [threading.Thread(target=worker) for _ in range(pool_size)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if errors:
+        raise RuntimeError(next((e for e in errors if not isinstance(e, threading.BrokenBarrierError)), errors[0]))
+
+    return {
+        "num_threads": num_threads,
+        "pool_size": pool_size,
+        "xnnpack": xnnpack,
+        "batch_size": batch_size,
+        "images_per_s": sum(rates),
+        "batch_p50_ms": float(np.median(latencies)) * 1000,
+    }
+
+def choose(results, max_latency_ms):
+    """Highest throughput within the latency budget, or the lowest latency if nothing fits it."""
+    within = [r for r in results if r["batch_p50_ms"] <= max_latency_ms]
+    if within:
+        return max(within, key=lambda r: r["images_per_s"])
+    return min(results, key=lambda r: r["batch_p50_ms"])
+
+def tune(model_path, threads=None, batch_sizes=BATCH_SIZES, xnnpack=(True, False), seconds=1.0,
+         max_latency_ms=100.0, verbose=True):
+    """Measure every configuration and return the tuning record for this machine."""
+    cores = os.cpu_count() or 1
+    threads = threads or thread_counts(cores)
+
+    results = []
+    if verbose:
+        print(f"{'xnnpack':>7} {'threads':>7} {'pool':>5} {'batch':>6} {'batch ms':>9} {'images/s':>9}")
+    for use_xnnpack in xnnpack:
+        for num_threads in threads:
+            for batch_size in batch_sizes:
+                try:
+                    result = measure(model_path, num_threads, use_xnnpack, batch_size, seconds, cores)
+                except (RuntimeError, ValueError) as e:
+                    print(f"⚠️ Skipping xnnpack={use_xnnpack} threads={num_threads} batch={batch_size}: {e}")
+                    continue
+                results.append(result)
+                if verbose:
+                    print(f"{'on' if use_xnnpack else 'off':>7} {num_threads:>7} {result['pool_size']:>5} "
+                          f"{batch_size:>6} {result['batch_p50_ms']:>9.1f} {result['images_per_s']:>9.0f}")
+    if not results:
+        raise RuntimeError("No configuration could be measured")
+
+    best = choose(results, max_latency_ms)
+    return {
+        **fingerprint(model_path),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "max_latency_ms": max_latency_ms,
+        "settings": {
+            "num_threads": best["num_threads"],
+            "pool_size": best["pool_size"],
+            "xnnpack": best["xnnpack"],
+            "max_batch_size": best["batch_size"],
+        },
+        "expected": {key: best[key] for key in ("images_per_s", "batch_p50_ms")},
+        "results": results,
+    }
+
+def save(tuning, path=DEFAULT_OUTPUT):
+    # Written under a temporary name so the server never reads half a file
+    with open(path + ".tmp", "w") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def load_tuning(path, model_path):
+    """The saved settings if they were measured on this machine for this model, otherwise {}."""
+    try:
+        with open(path) as f:
+            tuning = json.load(f)
+        current = fingerprint(model_path)
+    except (OSError, ValueError):
+        return {}
+    stale = [key for key in current if tuning.get(key) != current[key]]
+    if stale:
+        print(f"⚠️ Ignoring {path}: measured with a different {', '.join(stale)}; rerun autotune.py")
+        return {}
+    return tuning.get("settings", {})
+
+def report(tuning):
+    settings, expected = tuning["settings"], tuning["expected"]
+    print(f"✅ Fastest on {tuning['cpu_count']} cores ({tuning['backend']}): "
+          f"{settings['pool_size']} interpreters x {settings['num_threads']} threads, "
+          f"XNNPACK {'on' if settings['xnnpack'] else 'off'}, batches of up to {settings['max_batch_size']} "
+          f"({expected['images_per_s']:.0f} images/s, {expected['batch_p50_ms']:.1f} ms per batch)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark interpreter settings and save the fastest for this machine')
+    parser.add_argument('--model', default='duolingo_detector.tflite', help='TFLite model to tune (default: duolingo_detector.tflite)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f'Where to save the settings (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--threads', type=int, nargs='+',
+                        help='Threads per interpreter to try (default: 1, 2, 4, ... up to the core count)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(BATCH_SIZES),
+                        help=f'Batch sizes to try (default: {" ".join(map(str, BATCH_SIZES))})')
+    parser.add_argument('--xnnpack-only', action='store_true', help='Skip the runs without the XNNPACK delegate')
+    parser.add_argument('--seconds', type=float, default=1.0, help='Timed run per configuration (default: 1.0)')
+    parser.add_argument('--max-latency-ms', type=float, default=100.0,
+                        help='Slowest median batch latency to accept (default: 100)')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"❌ Model not found: {args.model}")
+        exit(1)
+
+    tuning = tune(args.model, args.threads, args.batch_sizes, (True,) if args.xnnpack_only else (True, False),
+                  args.seconds, args.max_latency_ms)
+    save(tuning, args.output)
+    report(tuning)
+    print(f"Settings written to {args.output}")
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+import numpy as np
+import metrics
+
+
+class MicroBatcher:
+    """
+    Group concurrent single-image requests into one batched model call.
+
+    Callers `submit()` one input at a time. A worker thread takes the oldest
+    waiting request and keeps collecting more until it has `max_batch_size`
+    of them or `max_wait_ms` has passed since that request was queued. The
+    stacked inputs go through `run_batch` once and every caller gets its own
+    row of the output back through a Future.
+
+    Args:
+        run_batch (callable): Takes an array of shape (n, ...) and returns n outputs
+        max_batch_size (int): Largest batch handed to `run_batch`
+        max_wait_ms (float): Longest time a request waits for others to join its batch
+        workers (int): Number of threads calling `run_batch` concurrently
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=5.0, workers=1):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = Queue()
+
+        # Statistics, guarded by _stats_lock
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._errors = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recent_waits = deque(maxlen=1024)
+
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"batcher-{i}", daemon=True).start()
+
+    def submit(self, x):
+        """Queue one input and return a Future for its output."""
+        future = Future()
+        self._queue.put((x, future, time.perf_counter()))
+        return future
+
+    def predict(self, x, timeout=None):
+        """Queue one input and block until its output is ready."""
+        return self.submit(x).result(timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Out of time, but still take whatever is already waiting
+                    batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            inputs, futures, queued_at = zip(*batch)
+            started = time.perf_counter()
+            self._record(len(batch), [started - t for t in queued_at])
+
+            try:
+                outputs = self.run_batch(np.stack(inputs))
+            except Exception as e:
+                with self._stats_lock:
+                    self._errors += 1
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
+
+    def _record(self, size, waits):
+        with self._stats_lock:
+            self._batch_sizes[size] += 1
+            self._requests += size
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, *waits)
+            self._recent_waits.extend(waits)
+        metrics.BATCH_SIZE.observe(size)
+        for wait in waits:
+            metrics.QUEUE_WAIT.observe(wait)
+
+    def stats(self):
+        """Return batch-size and queue-wait statistics since startup."""
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            recent = sorted(self._recent_waits)
+
+            def percentile(p):
+                if not recent:
+                    return 0.0
+                return recent[min(len(recent) - 1, int(p / 100 * len(recent)))] * 1000
+
+            return {
+                "batches": batches,
+                "requests": self._requests,
+                "failed_batches": self._errors,
+                "queued": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "mean_batch_size": self._requests / batches if batches else 0.0,
+                "batch_sizes": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                "queue_wait_ms": {
+                    "mean": self._wait_total / self._requests * 1000 if self._requests else 0.0,
+                    "p50": percentile(50),
+                    "p95": percentile(95),
+                    "max": self._wait_max * 1000,
+                },
+            }
@@ -0,0 +1,103 @@
+import argparse
+import io
+import os
+import time
+import numpy as np
+from PIL import Image
+from decode import IMG_SIZE, decode_pixels, preprocess
+
+def legacy_preprocess(img_bytes):
+    """The original app.py path: full decode, RGB conversion, then resize."""
+    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    img = img.resize(IMG_SIZE)
+    return np.array(img, dtype=np.float32) / 127.5 - 1
+
+def synthetic_photo(width, height, seed=0):
+    """A smooth gradient with sensor-like noise, so encoders behave like on real photos."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1) * 200
+    noise = rng.normal(0, 12, (height, width, 3))
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+def encode(img, fmt):
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(buf, fmt, quality=90)
+    else:
+        img.save(buf, fmt)
+    return buf.getvalue()
+
+def time_it(fn, data, repeat):
+    fn(data)  # warm up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+def benchmark(width, height, repeat):
+    img = synthetic_photo(width, height)
+    out = np.empty((*IMG_SIZE, 3), dtype=np.float32)
+
+    print(f"{'format':<6} {'size':>9} {'legacy ms':>10} {'fast ms':>9} {'speedup':>8}")
+    for fmt in ("JPEG", "PNG", "WEBP"):
+        data = encode(img, fmt)
+        legacy = time_it(legacy_preprocess, data, repeat)
+        fast = time_it(lambda b: preprocess(b, out), data, repeat)
+        print(f"{fmt:<6} {len(data) / 1e6:>7.1f}MB {legacy:>10.1f} {fast:>9.1f} {legacy / fast:>7.1f}x")
+
+def check_predictions(image_dir, model_path, tolerance, limit):
+    """Run both preprocessing paths through the model and compare confidences."""
+    from interpreter_pool import InterpreterPool
+
+    pool = InterpreterPool(model_path)
+    paths = []
+    for root, _, files in os.walk(image_dir):
+        for file in sorted(files):
+            if file.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+                paths.append(os.path.join(root, file))
+    paths = paths[:limit]
+
+    worst, flipped = 0.0, 0
+    with pool.checkout() as pooled:
+        interpreter = pooled.interpreter
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+
+            # Legacy float input goes through set_tensor exactly as the old app did
+            interpreter.set_tensor(pooled.input_index, legacy_preprocess(data)[None])
+            interpreter.invoke()
+            legacy = float(interpreter.get_tensor(pooled.output_index)[0][0])
+            fast = float(pooled.run(decode_pixels(data)[None])[0])
+
+            worst = max(worst, abs(legacy - fast))
+            flipped += (legacy > 0.5) != (fast > 0.5)
+
+    print(f"\nCompared {len(paths)} images: max confidence difference {worst:.4f}, "
+          f"{flipped} flipped predictions (tolerance {tolerance})")
+    return worst <= tolerance
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the legacy and fast preprocessing paths')
+    parser.add_argument('--width', type=int, default=4000, help='Synthetic image width (default: 4000)')
+    parser.add_argument('--height', type=int, default=3000, help='Synthetic image height (default: 3000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per format (default: 5)')
+    parser.add_argument('--images', help='Folder of real images to check predictions against')
+    parser.add_argument('--model', default='duolingo_detector.tflite', help='TFLite model for the check')
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help='Largest allowed confidence difference (default: 0.05)')
+    parser.add_argument('--limit', type=int, default=500, help='Max images to check (default: 500)')
+
+    args = parser.parse_args()
+
+    benchmark(args.width, args.height, args.repeat)
+
+    if args.images:
+        if not check_predictions(args.images, args.model, args.tolerance, args.limit):
+            print("❌ Fast path predictions differ beyond tolerance")
+            exit(1)
+        print("✅ Fast path predictions within tolerance")
@@ -0,0 +1,57 @@
+import argparse
+import random
+import time
+from hash_index import group_near_duplicates, hamming
+
+def synthetic_hashes(n, radius, duplicate_rate=0.05, bits=64, seed=0):
+    """Random hashes plus planted near-duplicates at most `radius` bits away from a random original."""
+    rng = random.Random(seed)
+    hashes = {i: rng.getrandbits(bits) for i in range(n)}
+    planted = []
+    for i in range(n, n + int(n * duplicate_rate)):
+        original = rng.randrange(n)
+        value = hashes[original]
+        for bit in rng.sample(range(bits), rng.randint(0, radius)):
+            value ^= 1 << bit
+        hashes[i] = value
+        planted.append((original, i))
+    return hashes, planted
+
+def naive_pairs(hashes, radius):
+    """The old all-pairs comparison, with a proper bit distance."""
+    items = list(hashes.items())
+    return sum(1 for i, (_, a) in enumerate(items) for _, b in items[i + 1:] if hamming(a, b) <= radius)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark near-duplicate grouping on synthetic 64-bit hashes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000],
+                        help='Numbers of hashes to test (default: 10000 100000)')
+    parser.add_argument('--radius', type=int, default=5, help='Max Hamming distance (default: 5)')
+    parser.add_argument('--naive-limit', type=int, default=5000,
+                        help='Largest size to time the quadratic scan on; bigger sizes are extrapolated')
+
+    args = parser.parse_args()
+
+    naive_per_pair = None
+    for n in sorted(args.sizes):
+        hashes, planted = synthetic_hashes(n, args.radius)
+
+        start = time.perf_counter()
+        groups = group_near_duplicates(hashes, args.radius)
+        indexed = time.perf_counter() - start
+
+        # Every planted copy must land in the same group as its original
+        group_of = {item: g for g, group in enumerate(groups) for item in group}
+        found = sum(1 for a, b in planted if a in group_of and group_of.get(a) == group_of.get(b))
+
+        sample = min(n, args.naive_limit)
+        if naive_per_pair is None:
+            sample_hashes = dict(list(hashes.items())[:sample])
+            start = time.perf_counter()
+            naive_pairs(sample_hashes, args.radius)
+            naive_per_pair = (time.perf_counter() - start) / (sample * (sample - 1) / 2)
+        total = len(hashes)
+        naive = naive_per_pair * total * (total - 1) / 2
+
+        print(f"{total:>8} hashes: indexed {indexed:7.2f}s, quadratic ~{naive:9.1f}s "
+              f"({naive / indexed:6.0f}x), {len(groups)} groups, {found}/{len(planted)} planted duplicates found")
@@ -0,0 +1,46 @@
+import argparse
+import time
+import tensorflow as tf
+from tensorflow.keras.preprocessing import image_dataset_from_directory
+from input_pipeline import build_dataset
+from pack_dataset import CLASS_NAMES
+
+def legacy_dataset(split_dir, batch_size):
+    """The original classifier.py pipeline: serial map, no cache, no prefetch."""
+    ds = image_dataset_from_directory(split_dir, image_size=(224, 224), batch_size=batch_size,
+                                      class_names=CLASS_NAMES)
+    return ds.map(lambda x, y: (tf.keras.applications.mobilenet_v2.preprocess_input(x), y))
+
+def throughput(ds, epochs):
+    """Images/sec for each full pass over ds."""
+    rates = []
+    for _ in range(epochs):
+        images = 0
+        start = time.perf_counter()
+        for x, _ in ds:
+            images += int(x.shape[0])
+        rates.append(images / (time.perf_counter() - start))
+    return rates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure input pipeline throughput against the original pipeline')
+    parser.add_argument('split', nargs='?', default='./dataset/train',
+                        help='Split folder with <class>/ subfolders (default: ./dataset/train)')
+    parser.add_argument('--batch-size', type=int, default=32, help='Images per batch (default: 32)')
+    parser.add_argument('--epochs', type=int, default=3,
+                        help='Passes per pipeline; cached pipelines speed up after the first (default: 3)')
+
+    args = parser.parse_args()
+
+    pipelines = {
+        "legacy": lambda: legacy_dataset(args.split, args.batch_size),
+        "parallel": lambda: build_dataset(args.split, args.batch_size, shuffle=True),
+        "parallel+cache": lambda: build_dataset(args.split, args.batch_size, shuffle=True, cache="memory"),
+    }
+
+    results = {name: throughput(make(), args.epochs) for name, make in pipelines.items()}
+
+    baseline = results["legacy"][-1]
+    print(f"{'pipeline':<16} {'first img/s':>12} {'last img/s':>11} {'speedup':>8}")
+    for name, rates in results.items():
+        print(f"{name:<16} {rates[0]:>12.0f} {rates[-1]:>11.0f} {rates[-1] / baseline:>7.1f}x")
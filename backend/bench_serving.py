@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+from bench_decode import encode, synthetic_photo, time_it
+
+IMAGE_SIZES = ((640, 480), (1920, 1080), (4000, 3000))
+FORMATS = ("JPEG", "PNG", "WEBP")
+
+# What the load test uploads: photos of every size, but no full-resolution PNG,
+# which would be over the server's upload limit anyway
+CORPUS_CASES = [(size, fmt) for size in IMAGE_SIZES for fmt in FORMATS if not (fmt == "PNG" and size == IMAGE_SIZES[-1])]
+
+def run_info():
+    """Git commit and time of this run, so result files can be compared across commits."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=here, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        commit, dirty = None, None
+    return {"commit": commit or None, "dirty": dirty, "time": datetime.now(timezone.utc).isoformat()}
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+def build_corpus(count, seed=0):
+    """Synthetic photos cycling through CORPUS_CASES."""
+    corpus = []
+    for i in range(count):
+        (width, height), fmt = CORPUS_CASES[i % len(CORPUS_CASES)]
+        corpus.append((f"{width}x{height}.{fmt.lower()}", encode(synthetic_photo(width, height, seed + i), fmt)))
+    return corpus
+
+def micro(model_path, threads, batch_sizes, repeat):
+    """Median preprocess() time per size and format, and invoke() time per thread count and batch size."""
+    from decode import IMG_SIZE, preprocess
+    from interpreter_pool import PooledInterpreter
+
+    results = {"preprocess": [], "invoke": []}
+    out = np.empty((*IMG_SIZE, 3), dtype=np.float32)
+
+    print(f"{'format':<6} {'size':>10} {'preprocess ms':>14}")
+    for width, height in IMAGE_SIZES:
+        img = synthetic_photo(width, height)
+        for fmt in FORMATS:
+            ms = time_it(lambda b: preprocess(b, out), encode(img, fmt), repeat)
+            results["preprocess"].append({"format": fmt, "width": width, "height": height, "median_ms": ms})
+            print(f"{fmt:<6} {f'{width}x{height}':>10} {ms:>14.1f}")
+
+    with open(model_path, "rb") as f:
+        model_content = f.read()
+
+    print(f"\n{'threads':>7} {'batch':>6} {'invoke ms':>10} {'ms/image':>9} {'images/s':>9}")
+    for num_threads in threads:
+        pooled = PooledInterpreter(model_content, num_threads)
+        for batch_size in batch_sizes:
+            pixels = np.random.default_rng(0).integers(0, 256, (batch_size, *IMG_SIZE, 3), dtype=np.uint8)
+            ms = time_it(pooled.run, pixels, repeat)
+            results["invoke"].append({"threads": num_threads, "batch_size": batch_size, "median_ms": ms,
+                                      "images_per_s": batch_size * 1000 / ms})
+            print(f"{num_threads:>7} {batch_size:>6} {ms:>10.1f} {ms / batch_size:>9.1f} {batch_size * 1000 / ms:>9.0f}")
+    return results
+
+def load(url, concurrency, requests_total, corpus_size, bust_cache, timeout):
+    """Hit /predict from `concurrency` threads and report latency percentiles and throughput."""
+    import requests
+
+    corpus = build_corpus(corpus_size)
+    local = threading.local()
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+
+    def send(i):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        name, data = corpus[i % len(corpus)]
+        if bust_cache:
+            # Trailing bytes are ignored by decoders but change the content hash,
+            # so the server's exact-match prediction cache never answers
+            data = data + os.urandom(16)
+        start = time.perf_counter()
+        try:
+            status = local.session.post(url, files={"image": (name, data)}, timeout=timeout).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            statuses[str(status)] += 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(send, range(requests_total)))
+    duration = time.perf_counter() - start
+
+    result = {
+        "url": url,
+        "concurrency": concurrency,
+        "requests": requests_total,
+        "ok": len(latencies),
+        "statuses": dict(statuses),
+        "duration_s": duration,
+        "requests_per_s": requests_total / duration,
+        **percentiles(latencies),
+    }
+    print(f"{result['ok']}/{requests_total} OK at concurrency {concurrency}: {result['requests_per_s']:.1f} req/s")
+    if latencies:
+        print(f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+    if len(statuses) > 1 or "200" not in statuses:
+        print(f"Statuses: {dict(statuses)}")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the serving path: micro-benchmarks or a load test')
+    parser.add_argument('--json', help='Write the results, with the git commit, to this file')
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    micro_parser = subparsers.add_parser('micro', help='Time preprocess() and interpreter invoke()')
+    micro_parser.add_argument('--model', default='duolingo_detector.tflite', help='TFLite model to time')
+    micro_parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4],
+                              help='Interpreter thread counts (default: 1 2 4)')
+    micro_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8],
+                              help='Batch sizes (default: 1 4 8)')
+    micro_parser.add_argument('--repeat', type=int, default=10, help='Timed runs per case (default: 10)')
+
+    load_parser = subparsers.add_parser('load', help='Send concurrent /predict requests to a running server')
+    load_parser.add_argument('--url', default='http://127.0.0.1:10000/predict',
+                             help='Endpoint to hit (default: http://127.0.0.1:10000/predict)')
+    load_parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight (default: 8)')
+    load_parser.add_argument('--requests', type=int, default=500, help='Total requests (default: 500)')
+    load_parser.add_argument('--corpus-size', type=int, default=16,
+                             help='Distinct images across sizes and formats (default: 16)')
+    load_parser.add_argument('--bust-cache', action='store_true',
+                             help='Make every request body unique so cached predictions are never served')
+    load_parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds (default: 30)')
+
+    args = parser.parse_args()
+
+    if args.mode == 'micro':
+        results = micro(args.model, args.threads, args.batch_sizes, args.repeat)
+    else:
+        results = load(args.url, args.concurrency, args.requests, args.corpus_size, args.bust_cache, args.timeout)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({**run_info(), "mode": args.mode, "config": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.json}")
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from tflite_backend import BACKENDS
+
+# Runs in a fresh interpreter so every measurement is a true cold start
+PROBE = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+import tflite_backend
+result = {"backend": tflite_backend.BACKEND, "import_s": time.perf_counter() - start, "import_rss_mb": rss_mb()}
+
+from interpreter_pool import InterpreterPool
+pool = InterpreterPool(sys.argv[1])
+pool.warmup()
+result["first_invoke_s"] = time.perf_counter() - start
+result["rss_mb"] = rss_mb()
+print(json.dumps(result))
+"""
+
+# Time until the Flask app can answer /predict, as gunicorn would see it
+APP_PROBE = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+result = {"backend": "app (" + app.inference.BACKEND + ")", "import_s": time.perf_counter() - start,
+          "import_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+with open(sys.argv[1], "rb") as f:
+    response = app.app.test_client().post("/predict", data={"image": (f, "probe.jpg")})
+assert response.status_code == 200, response.get_json()
+result["first_invoke_s"] = time.perf_counter() - start
+result["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(result))
+"""
+
+def run_probe(code, arg, env):
+    proc = subprocess.run([sys.executable, "-c", code, arg], env=env, capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def measure(model_path, image, repeat):
+    results = []
+    for backend in BACKENDS:
+        env = {**os.environ, "TFLITE_BACKEND": backend}
+        runs = [run_probe(PROBE, model_path, env) for _ in range(repeat)]
+        if None in runs:
+            print(f"Skipping {backend}: not installed")
+            continue
+        results.append(min(runs, key=lambda r: r["first_invoke_s"]))
+
+    if image:
+        env = {**os.environ, "MODEL_PATH": model_path}
+        run = run_probe(APP_PROBE, os.path.abspath(image), env)
+        if run:
+            results.append(run)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure cold-start time and memory for each TFLite backend')
+    parser.add_argument('--model', default='duolingo_detector.tflite', help='TFLite model to load')
+    parser.add_argument('--image', help='Also time the Flask app from import to its first /predict')
+    parser.add_argument('--repeat', type=int, default=3, help='Cold starts per backend, best is kept (default: 3)')
+    parser.add_argument('--json', help='Write the results to this file')
+
+    args = parser.parse_args()
+    results = measure(args.model, args.image, args.repeat)
+
+    print(f"\n{'backend':<26} {'import s':>9} {'import MB':>10} {'first invoke s':>15} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['backend']:<26} {r['import_s']:>9.2f} {r['import_rss_mb']:>10.0f} "
+              f"{r['first_invoke_s']:>15.2f} {r['rss_mb']:>8.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
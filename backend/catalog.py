@@ -0,0 +1,291 @@
+import argparse
+import errno
+import os
+import shutil
+import sqlite3
+from collections import namedtuple
+from hashing import DEFAULT_INDEX, IMAGE_EXTENSIONS
+
+CatalogEntry = namedtuple("CatalogEntry", "path root directory split label origin size mtime_ns")
+
+def describe(path, root):
+    """(split, label, origin) of an image from its place under root/<split>/<label>/."""
+    parts = os.path.relpath(path, root).split(os.sep)
+    split = parts[0] if len(parts) >= 2 else None
+    label = parts[1] if len(parts) >= 3 else None
+    origin = "augmented" if "_aug_" in os.path.basename(path) else "raw"
+    return split, label, origin
+
+def _prefix_range(folder):
+    """Bounds that select every path under folder with an indexed range query."""
+    return folder + os.sep, folder + chr(ord(os.sep) + 1)
+
+
+class Catalog:
+    """
+    Every image under the dataset folders, recorded once in SQLite.
+
+    A sync walks a root folder once and stores each image's split, label,
+    origin (raw, or augmented by augment.py), size and mtime, alongside the
+    hash cache in the same file. Tools then select files with indexed
+    queries instead of walking the tree again, and move or delete files in
+    batches that update the catalog in a single transaction.
+
+    Args:
+        db_path (str): SQLite file, shared with hashing.HashCache
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        with self.db:
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    root TEXT NOT NULL,
+                    directory TEXT NOT NULL,
+                    split TEXT,
+                    label TEXT,
+                    origin TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL
+                )
+            """)
+            self.db.execute("CREATE INDEX IF NOT EXISTS files_split_label ON files (root, split, label)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS files_directory ON files (directory)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS files_origin ON files (origin)")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS dirs (
+                    path TEXT PRIMARY KEY,
+                    parent TEXT,
+                    mtime_ns INTEGER NOT NULL
+                )
+            """)
+            self.db.execute("CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY)")
+
+    def root_of(self, folder):
+        """The synced root folder that contains folder, if any."""
+        folder = os.path.abspath(folder)
+        for (root,) in self.db.execute("SELECT path FROM roots ORDER BY length(path)"):
+            if folder == root or folder.startswith(root + os.sep):
+                return root
+        return None
+
+    def resolve_root(self, folder, root=None):
+        """The dataset root of folder: `root` if it contains folder, else a synced root that does, else folder."""
+        folder = os.path.abspath(folder)
+        if root is not None:
+            root = os.path.abspath(root)
+            if folder == root or folder.startswith(root + os.sep):
+                return root
+        return self.root_of(folder) or folder
+
+    def sync(self, folder, quick=False, root=None):
+        """
+        Bring the catalog up to date with everything under folder.
+
+        Splits and labels are read relative to the dataset root from
+        resolve_root(folder, root), so a subfolder can be re-synced on its
+        own. Files already catalogued under a different root (e.g. a
+        subfolder that was once synced as a root itself) are re-described
+        relative to the resolved one.
+
+        With quick=True, folders whose mtime has not changed since the last
+        sync are not listed again. Adding, removing or renaming files changes
+        a folder's mtime, but rewriting a file in place does not, so use a
+        full sync after tools that overwrite images.
+
+        Returns:
+            dict: Counts of added, updated and removed files and listed/skipped folders
+        """
+        top = os.path.abspath(folder)
+        root = self.resolve_root(top, root)
+        low, high = _prefix_range(top)
+        known_dirs = dict(self.db.execute(
+            "SELECT path, mtime_ns FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (top, low, high)))
+        known_files = {row[0]: row[1:] for row in self.db.execute(
+            "SELECT path, root, directory, size, mtime_ns FROM files WHERE path >= ? AND path < ?", (low, high))}
+
+        seen_dirs, listed, found = {}, set(), {}
+        stack = [top]
+        while stack:
+            folder = stack.pop()
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen_dirs[folder] = mtime_ns
+            if quick and known_dirs.get(folder) == mtime_ns:
+                stack.extend(path for (path,) in self.db.execute("SELECT path FROM dirs WHERE parent = ?", (folder,)))
+                continue
+
+            listed.add(folder)
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                        st = entry.stat()
+                        found[entry.path] = (folder, st.st_size, st.st_mtime_ns)
+
+        removed = {path for path, (_, folder, _, _) in known_files.items()
+                   if folder not in seen_dirs or (folder in listed and path not in found)}
+        changed = [(path, root, folder, *describe(path, root), size, mtime_ns)
+                   for path, (folder, size, mtime_ns) in found.items()
+                   if known_files.get(path) != (root, folder, size, mtime_ns)]
+        # Files in unlisted folders are not in `found`, but still need describing relative to this root
+        rerooted = [(root, *describe(path, root), path) for path, (old_root, *_) in known_files.items()
+                    if old_root != root and path not in found and path not in removed]
+
+        with self.db:
+            self.db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+            self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", changed)
+            self.db.executemany("UPDATE files SET root = ?, split = ?, label = ?, origin = ? WHERE path = ?", rerooted)
+            self.db.executemany("DELETE FROM dirs WHERE path = ?", [(path,) for path in known_dirs if path not in seen_dirs])
+            self.db.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+                                [(path, os.path.dirname(path), mtime_ns) for path, mtime_ns in seen_dirs.items()])
+            # Roots inside this folder have just had all their files moved over to `root`
+            self.db.execute("DELETE FROM roots WHERE (path = ? OR (path >= ? AND path < ?)) AND path != ?",
+                            (top, low, high, root))
+            self.db.execute("INSERT OR IGNORE INTO roots VALUES (?)", (root,))
+
+        added = sum(1 for row in changed if row[0] not in known_files)
+        return {"added": added, "updated": len(changed) - added + len(rerooted), "removed": len(removed),
+                "listed_dirs": len(listed), "skipped_dirs": len(seen_dirs) - len(listed)}
+
+    def files(self, under=None, split=None, label=None, origin=None, directory=None):
+        """
+        Catalogued images matching every filter given, ordered by path.
+
+        Args:
+            under (str): Only files somewhere below this folder
+            split (str | tuple): Split name(s)
+            label (str | tuple): Label name(s)
+            origin (str): "raw" or "augmented"
+            directory (str): Only files directly inside this folder
+        """
+        clauses, params = [], []
+        if under is not None:
+            clauses.append("path >= ? AND path < ?")
+            params.extend(_prefix_range(os.path.abspath(under)))
+        if directory is not None:
+            clauses.append("directory = ?")
+            params.append(os.path.abspath(directory))
+        for column, value in (("split", split), ("label", label), ("origin", origin)):
+            if value is None:
+                continue
+            values = (value,) if isinstance(value, str) else tuple(value)
+            clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT path, root, directory, split, label, origin, size, mtime_ns FROM files {where} ORDER BY path"
+        return [CatalogEntry(*row) for row in self.db.execute(query, params)]
+
+    @staticmethod
+    def stats(entries):
+        """path -> (size, mtime_ns), as hashing.compute_hashes accepts it."""
+        return {entry.path: (entry.size, entry.mtime_ns) for entry in entries}
+
+    def move(self, moves):
+        """
+        Move files and record the new locations in one transaction.
+
+        A destination that already exists on disk or in the catalog is never
+        overwritten; the file gets a free name with a _1, _2... suffix instead,
+        as del_dups.py does.
+
+        Args:
+            moves (list): (CatalogEntry, destination path) pairs
+
+        Returns:
+            list: (path, error) for every move that failed
+        """
+        done, errors, made, taken = [], [], set(), set()
+        for entry, dest in moves:
+            dest = self._free_path(os.path.abspath(dest), taken)
+            folder = os.path.dirname(dest)
+            try:
+                if folder not in made:
+                    os.makedirs(folder, exist_ok=True)
+                    made.add(folder)
+                try:
+                    os.replace(entry.path, dest)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    # A rename cannot cross filesystems, so copy and delete instead
+                    shutil.move(entry.path, dest)
+            except OSError as e:
+                errors.append((entry.path, str(e)))
+                continue
+            taken.add(dest)
+            inside = dest.startswith(entry.root + os.sep)
+            split, label, origin = describe(dest, entry.root) if inside else (None, None, entry.origin)
+            done.append((dest, entry.root, folder, split, label, origin, entry.size, entry.mtime_ns, entry.path))
+
+        try:
+            with self.db:
+                self.db.executemany("""
+                    UPDATE files SET path = ?, root = ?, directory = ?, split = ?, label = ?, origin = ?,
+                                     size = ?, mtime_ns = ?
+                    WHERE path = ?
+                """, done)
+        except sqlite3.Error:
+            # Put the files back so the disk still matches the unchanged catalog
+            for dest, *_, source in reversed(done):
+                try:
+                    shutil.move(dest, source)
+                except OSError:
+                    pass
+            raise
+        return errors
+
+    def _free_path(self, dest, taken):
+        """dest, or dest with a _1, _2... suffix, so that no file, catalog row or earlier move in this batch has it."""
+        name, ext = os.path.splitext(dest)
+        candidate, counter = dest, 1
+        while candidate in taken or os.path.lexists(candidate) or \
+                self.db.execute("SELECT 1 FROM files WHERE path = ?", (candidate,)).fetchone():
+            candidate = f"{name}_{counter}{ext}"
+            counter += 1
+        return candidate
+
+    def remove(self, entries):
+        """Delete files from disk and from the catalog in one transaction. Returns (path, error) failures."""
+        done, errors = [], []
+        for entry in entries:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append((entry.path, str(e)))
+                continue
+            done.append((entry.path,))
+        with self.db:
+            self.db.executemany("DELETE FROM files WHERE path = ?", done)
+        return errors
+
+    def close(self):
+        self.db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Index dataset images into the shared SQLite catalog')
+    parser.add_argument('roots', nargs='*', default=['./raw_data', './dataset'],
+                        help='Folders with <split>/<label>/ subfolders (default: ./raw_data ./dataset)')
+    parser.add_argument('--index', default=DEFAULT_INDEX, help=f'SQLite file (default: {DEFAULT_INDEX})')
+    parser.add_argument('--quick', action='store_true', help='Skip folders whose mtime has not changed')
+
+    args = parser.parse_args()
+
+    catalog = Catalog(args.index)
+    for root in args.roots:
+        if not os.path.isdir(root):
+            print(f"Skipping {root}: not a folder")
+            continue
+        result = catalog.sync(root, quick=args.quick)
+        print(f"{root}: {result['added']} added, {result['updated']} updated, {result['removed']} removed "
+              f"({result['listed_dirs']} folders listed, {result['skipped_dirs']} unchanged)")
+    catalog.close()
@@ -1,68 +1,105 @@
+import argparse
 import ssl
 from utils import preprocess_images
+from pack_dataset import PackedDataset
+from feature_cache import DEFAULT_CACHE_DIR, FEATURE_DIM, FeatureCache, directory_features, embedding_model, packed_features
 import tensorflow as tf
-from tensorflow.keras.preprocessing import image_dataset_from_directory
+from input_pipeline import build_dataset, cache_for, list_files
 import matplotlib.pyplot as plt
 
 # Fix SSL certificate issue on Mac
 ssl._create_default_https_context = ssl._create_unverified_context
 
-preprocess_images("./raw_data/train/duolingo", "./dataset/train/duolingo")
-preprocess_images("./raw_data/train/not_duolingo", "./dataset/train/not_duolingo")
-preprocess_images("./raw_data/validation/duolingo", "./dataset/validation/duolingo")
-preprocess_images("./raw_data/validation/not_duolingo", "./dataset/validation/not_duolingo")
-
-# Load training & validation datasets
-train_ds = image_dataset_from_directory(
-    "./dataset/train",
-    image_size=(224, 224),
-    batch_size=32,
-    class_names = ["not_duolingo", "duolingo"]
-)
-
-val_ds = image_dataset_from_directory(
-    "./dataset/validation",
-    image_size=(224, 224),
-    batch_size=32,
-    shuffle=False,
-    class_names = ["not_duolingo", "duolingo"]
-)
-
-# Normalize pixel values (0 to 1)
-train_ds = train_ds.map(lambda x, y: (tf.keras.applications.mobilenet_v2.preprocess_input(x), y))
-val_ds = val_ds.map(lambda x, y: (tf.keras.applications.mobilenet_v2.preprocess_input(x), y))
-
-# Load MobileNetV2 with pre-trained weights
-base_model = tf.keras.applications.MobileNetV2(
-    input_shape=(224, 224, 3),
-    include_top=False,
-    weights="imagenet"
-)
-base_model.trainable = False  # Freeze base model layers
+parser = argparse.ArgumentParser(description='Train the Duolingo classifier')
+parser.add_argument('--packed', help='Read train/validation from shards written by pack_dataset.py (e.g. ./packed)')
+parser.add_argument('--cached-features', action='store_true',
+                    help='Embed each image with the frozen backbone once, then train only the head on cached features')
+parser.add_argument('--feature-cache', default=DEFAULT_CACHE_DIR,
+                    help=f'Feature cache folder for --cached-features (default: {DEFAULT_CACHE_DIR})')
+parser.add_argument('--cache',
+                    help='Cache decoded images after the first epoch: "memory" or a folder such as ./tf_cache')
+parser.add_argument('--augment', action='store_true',
+                    help='Train on freshly augmented images every epoch, generated on the fly by augment.py')
+parser.add_argument('--seed', type=int, default=0, help='Base seed for --augment (default: 0)')
+parser.add_argument('--epochs', type=int, default=10, help='Training epochs (default: 10)')
+args = parser.parse_args()
+
+# --augment streams from ./dataset/train, and cached features are embedded from the unaugmented images
+if args.augment and args.packed:
+    parser.error("--augment reads ./dataset/train and cannot be combined with --packed")
+if args.augment and args.cached_features:
+    parser.error("--augment cannot be combined with --cached-features, which trains on unaugmented images")
+
+if not args.packed:
+    preprocess_images("./raw_data/train/duolingo", "./dataset/train/duolingo")
+    preprocess_images("./raw_data/train/not_duolingo", "./dataset/train/not_duolingo")
+    preprocess_images("./raw_data/validation/duolingo", "./dataset/validation/duolingo")
+    preprocess_images("./raw_data/validation/not_duolingo", "./dataset/validation/not_duolingo")
+
+# Load MobileNetV2 with pre-trained weights, frozen, plus the pooling that feeds the head
+base_model, embed = embedding_model()
+
+if args.cached_features:
+    # The backbone never changes while the head trains, so its pooled output
+    # is computed once per image and read back from disk in later runs
+    cache = FeatureCache(args.feature_cache)
+    if args.packed:
+        train_x, train_y = packed_features(PackedDataset(f"{args.packed}/train"), cache, embed)
+        val_x, val_y = packed_features(PackedDataset(f"{args.packed}/validation"), cache, embed)
+    else:
+        train_x, train_y = directory_features("./dataset/train", cache, embed)
+        val_x, val_y = directory_features("./dataset/validation", cache, embed)
+
+    train_ds = tf.data.Dataset.from_tensor_slices((train_x.astype("float32"), train_y)) \
+        .shuffle(len(train_y), reshuffle_each_iteration=True).batch(32).prefetch(tf.data.AUTOTUNE)
+    val_ds = tf.data.Dataset.from_tensor_slices((val_x.astype("float32"), val_y)).batch(32)
+else:
+    # Packed shards are memory-mapped; folders are decoded on parallel calls
+    train_source = PackedDataset(f"{args.packed}/train") if args.packed else "./dataset/train"
+    if args.augment:
+        # Augmented images are generated on worker threads as training consumes them,
+        # so no augmented copies are written to disk
+        from augment import AugmentedStream
+        train_source = AugmentedStream(*list_files("./dataset/train"), seed=args.seed)
+    val_source = PackedDataset(f"{args.packed}/validation") if args.packed else "./dataset/validation"
+    train_ds = build_dataset(train_source, batch_size=32, shuffle=True, cache=cache_for(args.cache, "train"))
+    val_ds = build_dataset(val_source, batch_size=32, cache=cache_for(args.cache, "validation"))
 
 # Add classification layers
-model = tf.keras.Sequential([
-    base_model,
-    tf.keras.layers.GlobalAveragePooling2D(),
+head = [
     tf.keras.layers.Dense(128, activation="relu"),
     tf.keras.layers.Dropout(0.3),
     tf.keras.layers.Dense(1, activation="sigmoid")  # Binary classification (duolingo / not_duolingo)
-])
+]
 
-# Compile the model
-model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-    loss="binary_crossentropy",
-    metrics=["accuracy"]
-)
+def compile_model(model):
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+        loss="binary_crossentropy",
+        metrics=["accuracy"]
+    )
 
 class_weight = {
     0: (4000 + 2000) / 2000,  # "Duolingo" (minority)
     1: 1.0  # "Not Duolingo" (majority)
 }
 
-# Train the model
-history = model.fit(train_ds, validation_data=val_ds, epochs=10, class_weight=class_weight)
+if args.cached_features:
+    # Train the head alone on the cached features
+    head_model = tf.keras.Sequential([tf.keras.Input(shape=(FEATURE_DIM,)), *head])
+    compile_model(head_model)
+    history = head_model.fit(train_ds, validation_data=val_ds, epochs=args.epochs, class_weight=class_weight)
+
+    # Put the trained head back on the backbone so the saved model takes images as before
+    model = tf.keras.Sequential([base_model, tf.keras.layers.GlobalAveragePooling2D(), *head])
+    compile_model(model)
+else:
+    model = tf.keras.Sequential([base_model, tf.keras.layers.GlobalAveragePooling2D(), *head])
+    compile_model(model)
+
+    # Train the model
+    history = model.fit(train_ds, validation_data=val_ds, epochs=args.epochs, class_weight=class_weight)
+
 model.save("duolingo_detector.keras")
 
 # Plot training history
@@ -0,0 +1,55 @@
+"""
+Reference client for the compact /predict upload format.
+
+Decodes and resizes each image locally, with the same draft + bicubic resize
+the server uses, and sends only the 224x224 pixels as a tensor payload (see
+tensor_payload.py). A 12MP photo goes over the wire as ~100KB instead of
+several MB, and the server does no decoding.
+
+Usage: python client.py photo.jpg [more.png ...] --url http://localhost:10000/predict
+"""
+import argparse
+import os
+import requests
+import tensor_payload
+from decode import decode_pixels
+
+DEFAULT_URL = "http://localhost:10000/predict"
+
+def encode_image(img_bytes, compress=True):
+    """Encoded image bytes -> tensor payload bytes."""
+    return tensor_payload.encode(decode_pixels(img_bytes), compress=compress)
+
+def send(payload, url=DEFAULT_URL, session=None, timeout=30):
+    """POST a tensor payload and return the JSON response, which holds "error" if it was refused."""
+    response = (session or requests).post(url, data=payload, timeout=timeout,
+                                          headers={"Content-Type": tensor_payload.CONTENT_TYPE})
+    return response.json()
+
+def predict(img_bytes, url=DEFAULT_URL, compress=True, session=None, timeout=30):
+    """Send one encoded image as a tensor payload and return the server's JSON response."""
+    return send(encode_image(img_bytes, compress), url, session, timeout)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Classify images by sending pre-resized tensors to /predict')
+    parser.add_argument('images', nargs='+', help='Image files to classify')
+    parser.add_argument('--url', default=DEFAULT_URL, help=f'/predict endpoint (default: {DEFAULT_URL})')
+    parser.add_argument('--no-compress', action='store_true', help='Send raw pixels without zlib')
+
+    args = parser.parse_args()
+
+    session = requests.Session()
+    for path in args.images:
+        with open(path, 'rb') as f:
+            img_bytes = f.read()
+        payload = encode_image(img_bytes, compress=not args.no_compress)
+        try:
+            result = send(payload, args.url, session)
+        except (requests.RequestException, ValueError) as e:
+            print(f"❌ {path}: {e}")
+            continue
+        if "error" in result:
+            print(f"❌ {path}: {result['error']}")
+            continue
+        print(f"✅ {path}: {result['prediction']} ({result['confidence']:.3f}), "
+              f"sent {len(payload) / 1024:.0f}KB instead of {os.path.getsize(path) / 1024:.0f}KB")
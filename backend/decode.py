@@ -0,0 +1,59 @@
+import io
+import numpy as np
+from PIL import Image
+
+IMG_SIZE = (224, 224)
+
+# JPEGs are decoded at the smallest DCT scale that still covers this size
+DRAFT_SIZE = (IMG_SIZE[0] * 2, IMG_SIZE[1] * 2)
+
+# Modes that resize correctly as-is; anything else (palette, 1-bit, 16-bit...) is converted first
+RESIZABLE_MODES = ("RGB", "RGBA", "L", "LA", "CMYK", "YCbCr")
+
+def draft_scale(width, height, draft_size=DRAFT_SIZE):
+    """The 1/n reduction libjpeg applies when drafting a width x height JPEG."""
+    scale = min(width // draft_size[0], height // draft_size[1])
+    for reduce in (8, 4, 2):
+        if scale >= reduce:
+            return reduce
+    return 1
+
+def load_image(img_bytes, draft_size=DRAFT_SIZE):
+    """
+    Decode an upload at the smallest resolution that still covers `draft_size`.
+
+    For JPEGs, draft() makes libjpeg decode at 1/2, 1/4 or 1/8 scale using
+    DCT scaling, so a 12MP photo never gets fully decoded. Keeping at least 2x
+    the model size lets the final resize still antialias; drafting all the way
+    down to IMG_SIZE visibly shifts predictions. Other formats are decoded at
+    full size.
+    """
+    img = Image.open(io.BytesIO(img_bytes))
+    img.draft("RGB", draft_size)
+    img.load()
+    return img
+
+def to_pixels(img, size=IMG_SIZE):
+    """Resize a decoded image to `size` and return it as a (h, w, 3) uint8 array."""
+    if img.mode not in RESIZABLE_MODES:
+        img = img.convert("RGB")
+
+    # Resize before the color conversion so it only touches size[0] * size[1] pixels.
+    # reducing_gap lets PIL box-reduce by an integer factor before the bicubic pass.
+    img = img.resize(size, Image.BICUBIC, reducing_gap=3.0)
+    return np.asarray(img.convert("RGB"))
+
+def decode_pixels(img_bytes, size=IMG_SIZE):
+    return to_pixels(load_image(img_bytes), size)
+
+def normalize_into(pixels, out):
+    """Write MobileNetV2-scaled pixels ([-1, 1]) into a preallocated float32 buffer."""
+    np.multiply(pixels, np.float32(1 / 127.5), out=out)
+    np.subtract(out, np.float32(1), out=out)
+    return out
+
+def preprocess(img_bytes, out=None):
+    """Decode an upload straight into a (224, 224, 3) float32 model input."""
+    if out is None:
+        out = np.empty((*IMG_SIZE, 3), dtype=np.float32)
+    return normalize_into(decode_pixels(img_bytes), out)
@@ -1,51 +1,50 @@
 import os
-import glob
-from tqdm import tqdm
+from catalog import Catalog
+from hashing import DEFAULT_INDEX
 
-def delete_augmented_files(directory, dry_run=False):
+def delete_augmented_files(directory, dry_run=False, root="./dataset", index_path=DEFAULT_INDEX):
     """
-    Delete all files containing '_aug_' in their names.
-    
+    Delete all images containing '_aug_' in their names.
+
+    The folder is quick-synced into the catalog as part of its dataset
+    root (root if it contains the folder, otherwise the synced root that
+    does), so its splits and labels stay correct. Augmented images are
+    selected with an indexed query, and deleted in one batch that removes
+    them from the catalog in a single transaction.
+
     Args:
         directory (str): Path to directory to search
         dry_run (bool): If True, only show what would be deleted without actually deleting
+        root (str): Dataset root the folder belongs to
+        index_path (str): Catalog SQLite file
     """
-    # Find all files with '_aug_' in the name (case insensitive)
-    pattern = os.path.join(directory, '**', '*_aug_*')
-    augmented_files = glob.glob(pattern, recursive=True)
-    
-    if not augmented_files:
-        print(f"No files containing '_aug_' found in {directory}")
-        return
-    
-    print(f"Found {len(augmented_files)} files containing '_aug_'")
-    
-    if dry_run:
-        print("\nDry run mode - no files will be deleted")
-    
-    deleted_count = 0
-    errors = []
-    
-    for file_path in tqdm(augmented_files, desc="Processing files"):
-        try:
-            if dry_run:
-                print(f"[Dry Run] Would delete: {file_path}")
-            else:
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                    deleted_count += 1
-                else:
-                    errors.append(f"Not a file: {file_path}")
-        except Exception as e:
-            errors.append(f"Error deleting {file_path}: {str(e)}")
-    
-    if not dry_run:
-        print(f"\nSuccessfully deleted {deleted_count}/{len(augmented_files)} files")
-    
+    catalog = Catalog(index_path)
+    try:
+        catalog.sync(directory, quick=True, root=root)
+        augmented_files = catalog.files(under=directory, origin="augmented")
+
+        if not augmented_files:
+            print(f"No files containing '_aug_' found in {directory}")
+            return
+
+        print(f"Found {len(augmented_files)} files containing '_aug_'")
+
+        if dry_run:
+            print("\nDry run mode - no files will be deleted")
+            for entry in augmented_files:
+                print(f"[Dry Run] Would delete: {entry.path}")
+            return
+
+        errors = catalog.remove(augmented_files)
+    finally:
+        catalog.close()
+
+    print(f"\nSuccessfully deleted {len(augmented_files) - len(errors)}/{len(augmented_files)} files")
+
     if errors:
         print("\nErrors encountered:")
-        for error in errors:
-            print(f" - {error}")
+        for path, error in errors:
+            print(f" - Error deleting {path}: {error}")
 
 if __name__ == "__main__":
     import argparse
@@ -54,6 +53,8 @@ if __name__ == "__main__":
     parser.add_argument('directory', help='Directory to search for files')
     parser.add_argument('--dry-run', action='store_true',
                       help='Show what would be deleted without actually deleting')
+    parser.add_argument('--root', default='./dataset',
+                      help='Dataset root the directory belongs to, kept in the catalog (default: ./dataset)')
     
     args = parser.parse_args()
     
@@ -61,4 +62,4 @@ if __name__ == "__main__":
         print(f"Error: Directory '{args.directory}' does not exist")
         exit(1)
     
-    delete_augmented_files(args.directory, args.dry_run)
\ No newline at end of file
+    delete_augmented_files(args.directory, args.dry_run, args.root)
@@ -1,9 +1,7 @@
 import os
-import hashlib
-from PIL import Image
-import imagehash
-from collections import defaultdict
 import shutil
+from hash_index import group_near_duplicates
+from hashing import compute_hashes, list_images
 
 def find_duplicates(folder_path, hash_size=8, max_distance=5, move_to_folder=None):
     """
@@ -12,65 +10,28 @@ def find_duplicates(folder_path, hash_size=8, max_distance=5, move_to_folder=Non
     Parameters:
     - folder_path: Path to the folder containing images
     - hash_size: Size of the hash (8 is good for most cases)
-    - max_distance: Maximum hash distance to consider images as duplicates
+    - max_distance: Maximum number of differing hash bits to consider images as duplicates
     - move_to_folder: If specified, moves duplicates here instead of deleting
     """
-    # Create dictionary to store hashes
-    hashes = defaultdict(list)
-    
-    # Supported image extensions
-    image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
-    
     # Create folder for duplicates if needed
     if move_to_folder and not os.path.exists(move_to_folder):
         os.makedirs(move_to_folder)
     
     print(f"Scanning {folder_path} for duplicate images...")
     
-    # Walk through all files in the folder
-    for root, _, files in os.walk(folder_path):
-        for filename in files:
-            if filename.lower().endswith(image_extensions):
-                filepath = os.path.join(root, filename)
-                
-                try:
-                    # Calculate perceptual hash of the image
-                    with Image.open(filepath) as img:
-                        # Convert to RGB if needed
-                        if img.mode not in ('RGB', 'L'):
-                            img = img.convert('RGB')
-                        img_hash = str(imagehash.phash(img, hash_size=hash_size))
-                        
-                    # Add to our dictionary
-                    hashes[img_hash].append(filepath)
-                except Exception as e:
-                    print(f"Error processing {filename}: {e}")
-    
-    print(f"\nFound {len(hashes)} unique images.")
-    
-    # Find duplicates by comparing hashes
-    duplicate_groups = []
-    hash_list = list(hashes.keys())
+    # Perceptual hash of every image, packed into an int. Unchanged files come
+    # from the on-disk cache; the rest are hashed in parallel.
+    hashes = {path: values["phash"] for path, values in
+              compute_hashes(list_images(folder_path), hash_types=("phash",), hash_size=hash_size).items()}
     
-    for i, hash1 in enumerate(hash_list):
-        for hash2 in hash_list[i+1:]:
-            # Calculate hamming distance between hashes
-            distance = sum(c1 != c2 for c1, c2 in zip(hash1, hash2))
-            if distance <= max_distance:
-                # Combine the groups
-                combined = hashes[hash1] + hashes[hash2]
-                duplicate_groups.append(combined)
-                # Remove the hashes to avoid duplicate groups
-                if hash1 in hashes:
-                    del hashes[hash1]
-                if hash2 in hashes:
-                    del hashes[hash2]
-                break
+    print(f"\nHashed {len(hashes)} images.")
     
-    # Add remaining groups with multiple files
-    for hash_val, files in hashes.items():
-        if len(files) > 1:
-            duplicate_groups.append(files)
+    # Group images whose hashes differ in at most max_distance bits. The index
+    # only compares likely candidates, and union-find merges chains of near
+    # matches (a~b, b~c) into one group.
+    duplicate_groups = [sorted(group) for group in
+                        group_near_duplicates(hashes, max_distance, bits=hash_size * hash_size)]
+    duplicate_groups.sort()
     
     total_duplicates = sum(len(group) - 1 for group in duplicate_groups)
     print(f"Found {total_duplicates} duplicate images in {len(duplicate_groups)} groups.")
@@ -121,7 +82,7 @@ if __name__ == "__main__":
     parser.add_argument('--hash-size', type=int, default=8, 
                        help='Perceptual hash size (default: 8)')
     parser.add_argument('--max-distance', type=int, default=5,
-                       help='Maximum hash distance to consider images as duplicates (default: 5)')
+                       help='Maximum number of differing hash bits to consider images as duplicates (default: 5)')
     
     args = parser.parse_args()
     
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursting up to `capacity`.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Most tokens that can be saved up
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Manifest:
+    """
+    Append-only JSONL log of downloads: one {"url", "hash", "status", "path"} line per item.
+
+    Reloading it tells a restarted run which URLs are finished and which
+    content hashes are already on disk. The last line for a URL wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by a crash
+                    self.entries[entry["url"]] = entry
+        self.hashes = {e["hash"]: e["path"] for e in self.entries.values() if e["status"] == "ok"}
+        self._lock = threading.Lock()
+
+    def done(self, url):
+        entry = self.entries.get(url)
+        return entry is not None and entry["status"] in ("ok", "duplicate")
+
+    def count(self, status="ok"):
+        return sum(1 for e in self.entries.values() if e["status"] == status)
+
+    def record(self, url, status, content_hash=None, path=None, error=None):
+        entry = {"url": url, "hash": content_hash, "status": status, "path": path}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self.entries[url] = entry
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+
+def make_session(pool_size=8, retries=3):
+    """A requests session with pooled keep-alive connections and retries on 429/5xx."""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",), respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class Downloader:
+    """
+    Concurrent, resumable file downloads.
+
+    Files are fetched by a bounded thread pool over one pooled session. Each
+    file is named after its content hash, and a file whose bytes are already
+    on disk is recorded as a duplicate instead of being written again. Every
+    result goes to the manifest, so a restarted run skips finished URLs.
+
+    Args:
+        output_dir (str): Where files are written
+        manifest_path (str): JSONL manifest (default: output_dir/manifest.jsonl)
+        workers (int): Concurrent downloads
+        limiter (TokenBucket): Optional rate limit for file requests
+        prefix (str): File name prefix
+        extension (str): File name extension
+        timeout (float): Per-request timeout in seconds
+    """
+
+    def __init__(self, output_dir, manifest_path=None, workers=8, limiter=None, prefix="", extension=".jpg",
+                 timeout=30):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.manifest = Manifest(manifest_path or os.path.join(output_dir, "manifest.jsonl"))
+        self.workers = workers
+        self.limiter = limiter
+        self.prefix = prefix
+        self.extension = extension
+        self.timeout = timeout
+        self.session = make_session(workers)
+        self._hash_lock = threading.Lock()
+
+    def get_json(self, url, limiter=None, **kwargs):
+        """GET a JSON document through the shared session, waiting on `limiter` first."""
+        if limiter is not None:
+            limiter.acquire()
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def download(self, url):
+        """Fetch one URL into output_dir and return its manifest entry."""
+        if self.manifest.done(url):
+            return self.manifest.entries[url]
+        try:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.content
+        except requests.RequestException as e:
+            return self.manifest.record(url, "failed", error=str(e))
+
+        content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._hash_lock:
+            if content_hash in self.manifest.hashes:
+                return self.manifest.record(url, "duplicate", content_hash, self.manifest.hashes[content_hash])
+            path = os.path.join(self.output_dir, f"{self.prefix}{content_hash}{self.extension}")
+            self.manifest.hashes[content_hash] = path
+
+        # Written under a temporary name so a crash never leaves a truncated image behind
+        try:
+            with open(path + ".part", "wb") as f:
+                f.write(data)
+            os.replace(path + ".part", path)
+        except OSError as e:
+            try:
+                os.remove(path + ".part")
+            except OSError:
+                pass
+            # Later copies of this content must not be recorded as duplicates of a missing file
+            with self._hash_lock:
+                if self.manifest.hashes.get(content_hash) == path:
+                    del self.manifest.hashes[content_hash]
+                # Copies that arrived while this one was being written pointed at it too
+                orphans = [u for u, entry in list(self.manifest.entries.items())
+                           if entry["status"] == "duplicate" and entry["path"] == path]
+            for orphan in orphans:
+                self.manifest.record(orphan, "failed", content_hash, error=f"Original write failed: {e}")
+            return self.manifest.record(url, "failed", content_hash, error=str(e))
+        return self.manifest.record(url, "ok", content_hash, path)
+
+    def download_all(self, urls, on_result=None):
+        """Download every URL concurrently; returns the manifest entries in order."""
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="download") as executor:
+            results = []
+            for entry in executor.map(self.download, urls):
+                if on_result:
+                    on_result(entry)
+                results.append(entry)
+            return results
@@ -0,0 +1,107 @@
+import numpy as np
+
+# Keras clips probabilities by this much before taking logs
+EPSILON = 1e-7
+
+
+class StreamingEvaluator:
+    """
+    Binary classification metrics accumulated one batch at a time.
+
+    Only running sums, a 2x2 confusion matrix and the indices of
+    misclassified samples are kept, so memory does not grow with the number
+    of correctly classified images.
+
+    Args:
+        class_names (list): Display names for label 0 and label 1
+        threshold (float): Probability at or above which a sample is predicted as 1
+    """
+
+    def __init__(self, class_names=("Not Duolingo", "Duolingo"), threshold=0.5):
+        self.class_names = list(class_names)
+        self.threshold = threshold
+        self.confusion = np.zeros((2, 2), dtype=np.int64)  # rows: true label, columns: predicted
+        self.loss_sum = 0.0
+        self.count = 0
+        self.false_positives = []
+        self.false_negatives = []
+
+    def update(self, y_true, probs):
+        """Add a batch of true labels and predicted probabilities of label 1."""
+        y_true = np.asarray(y_true).reshape(-1).astype(np.int64)
+        probs = np.asarray(probs, dtype=np.float64).reshape(-1)
+        y_pred = (probs >= self.threshold).astype(np.int64)
+
+        clipped = np.clip(probs, EPSILON, 1 - EPSILON)
+        self.loss_sum += float(-np.sum(y_true * np.log(clipped) + (1 - y_true) * np.log(1 - clipped)))
+        np.add.at(self.confusion, (y_true, y_pred), 1)
+
+        indices = self.count + np.arange(len(y_true))
+        self.false_positives.extend(indices[(y_true == 0) & (y_pred == 1)].tolist())
+        self.false_negatives.extend(indices[(y_true == 1) & (y_pred == 0)].tolist())
+        self.count += len(y_true)
+
+    @property
+    def loss(self):
+        return self.loss_sum / max(self.count, 1)
+
+    @property
+    def accuracy(self):
+        return float(np.trace(self.confusion)) / max(self.count, 1)
+
+    def report(self):
+        """Per-class precision/recall/F1/support plus averages, like sklearn's output_dict."""
+        report = {}
+        supports = self.confusion.sum(axis=1)
+        predicted = self.confusion.sum(axis=0)
+        for label, name in enumerate(self.class_names):
+            hits = self.confusion[label, label]
+            precision = hits / predicted[label] if predicted[label] else 0.0
+            recall = hits / supports[label] if supports[label] else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            report[name] = {"precision": float(precision), "recall": float(recall),
+                            "f1-score": float(f1), "support": int(supports[label])}
+
+        per_class = [report[name] for name in self.class_names]
+        total = max(int(supports.sum()), 1)
+        report["accuracy"] = self.accuracy
+        for average, weights in (("macro avg", [1 / len(per_class)] * len(per_class)),
+                                 ("weighted avg", [c["support"] / total for c in per_class])):
+            report[average] = {metric: float(sum(w * c[metric] for w, c in zip(weights, per_class)))
+                               for metric in ("precision", "recall", "f1-score")}
+            report[average]["support"] = int(supports.sum())
+        return report
+
+    def format_report(self):
+        """The report as a text table laid out like sklearn's classification_report."""
+        report = self.report()
+        width = max(len(name) for name in [*self.class_names, "weighted avg"])
+        lines = [f"{'':>{width}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", ""]
+        for name in self.class_names:
+            row = report[name]
+            lines.append(f"{name:>{width}} {row['precision']:>9.2f} {row['recall']:>9.2f} "
+                         f"{row['f1-score']:>9.2f} {row['support']:>9}")
+        lines.append("")
+        lines.append(f"{'accuracy':>{width}} {'':>9} {'':>9} {report['accuracy']:>9.2f} {self.count:>9}")
+        for average in ("macro avg", "weighted avg"):
+            row = report[average]
+            lines.append(f"{average:>{width}} {row['precision']:>9.2f} {row['recall']:>9.2f} "
+                         f"{row['f1-score']:>9.2f} {row['support']:>9}")
+        return "\n".join(lines)
+
+def evaluate(predict_batch, ds, evaluator=None):
+    """
+    Run every batch of ds through predict_batch once and accumulate the metrics.
+
+    Args:
+        predict_batch (callable): Batch of model inputs -> probabilities of label 1
+        ds (iterable): (inputs, labels) batches, e.g. from input_pipeline.build_dataset
+        evaluator (StreamingEvaluator): Accumulator to use (default: a new one)
+
+    Returns:
+        StreamingEvaluator
+    """
+    evaluator = evaluator or StreamingEvaluator()
+    for x, y in ds:
+        evaluator.update(np.asarray(y), predict_batch(x))
+    return evaluator
@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from tqdm import tqdm
+from pack_dataset import CLASS_NAMES, DATASET_EXTENSIONS, _load
+from hashing import list_images
+
+# Width of MobileNetV2's globally pooled output
+FEATURE_DIM = 1280
+
+DEFAULT_CACHE_DIR = "feature_cache/mobilenet_v2_224"
+
+def content_key(data):
+    """Hex blake2b digest of raw file bytes or pixel data."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class FeatureCache:
+    """
+    Backbone embeddings stored on disk as a float16 memory-mapped array.
+
+    Rows are appended to features.f16 and their content keys to keys.txt in
+    the same order, so the cache only ever grows and never rewrites existing
+    data. A run that dies between the two writes leaves a row without a key
+    (or a partial key); both files are cut back to the rows they agree on
+    the next time the cache is opened, and every append is written at the
+    offset the index expects, so keys always line up with their rows.
+
+    Args:
+        cache_dir (str): Folder holding features.f16 and keys.txt
+        dim (int): Feature width
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, dim=FEATURE_DIM):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.dim = dim
+        self._row_bytes = dim * np.dtype(np.float16).itemsize
+        self._features_path = os.path.join(cache_dir, "features.f16")
+        self._keys_path = os.path.join(cache_dir, "keys.txt")
+
+        # Only newline-terminated keys were written completely
+        keys, key_ends = [], []
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    keys.append(line.decode().strip())
+                    key_ends.append((key_ends[-1] if key_ends else 0) + len(line))
+        rows = os.path.getsize(self._features_path) // self._row_bytes if os.path.exists(self._features_path) else 0
+
+        # Only rows whose key and features both made it to disk count; cut off the rest
+        count = min(rows, len(keys))
+        self._keys_bytes = key_ends[count - 1] if count else 0
+        for path, size in ((self._features_path, count * self._row_bytes), (self._keys_path, self._keys_bytes)):
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)
+            elif not os.path.exists(path):
+                open(path, "wb").close()
+        self._rows = {}
+        for i, key in enumerate(keys[:count]):
+            self._rows.setdefault(key, i)
+        self._count = count
+        self._features = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def _mapped(self):
+        if self._features is None or len(self._features) != self._count:
+            self._features = np.memmap(self._features_path, dtype=np.float16, mode="r", shape=(self._count, self.dim))
+        return self._features
+
+    def add(self, keys, features):
+        """Append features (n, dim) for keys not already stored; a key repeated in keys is stored once."""
+        features = np.asarray(features, dtype=np.float16).reshape(len(keys), self.dim)
+        new, seen = [], set()
+        for i, key in enumerate(keys):
+            if key not in self._rows and key not in seen:
+                seen.add(key)
+                new.append(i)
+        if not new:
+            return
+        key_lines = "".join(f"{keys[i]}\n" for i in new).encode()
+        # Written at the offsets the index expects, so a failed earlier append cannot shift rows
+        with open(self._features_path, "r+b") as f:
+            f.seek(self._count * self._row_bytes)
+            f.write(features[new].tobytes())
+            f.truncate()
+        with open(self._keys_path, "r+b") as f:
+            f.seek(self._keys_bytes)
+            f.write(key_lines)
+            f.truncate()
+        for i in new:
+            self._rows[keys[i]] = self._count
+            self._count += 1
+        self._keys_bytes += len(key_lines)
+
+    def lookup(self, keys):
+        """Return a float16 (n, dim) array of the stored features for keys."""
+        return self._mapped()[[self._rows[key] for key in keys]]
+
+def embedding_model():
+    """Frozen ImageNet MobileNetV2 with global average pooling, as used by classifier.py."""
+    import tensorflow as tf
+
+    base_model = tf.keras.applications.MobileNetV2(input_shape=(224, 224, 3), include_top=False, weights="imagenet")
+    base_model.trainable = False
+    return base_model, tf.keras.Sequential([base_model, tf.keras.layers.GlobalAveragePooling2D()])
+
+def cached_features(keys, load_pixels, cache, embed, batch_size=64, desc="Embedding images"):
+    """
+    Features for every key, running the backbone only on keys not yet cached.
+
+    Args:
+        keys (list): Content key of each item
+        load_pixels (callable): index -> uint8 (224, 224, 3) pixels, called only for misses
+        cache (FeatureCache): Where features are read from and stored
+        embed (tf.keras.Model): Maps a raw-pixel batch to pooled features
+        batch_size (int): Images per backbone call
+    """
+    from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
+
+    # Identical images share one cache row, so each is embedded once
+    todo, queued = [], set()
+    for i, key in enumerate(keys):
+        if key not in cache and key not in queued:
+            queued.add(key)
+            todo.append(i)
+    print(f"{desc}: {len(keys) - len(todo)} cached, {len(todo)} to embed")
+
+    with ThreadPoolExecutor(os.cpu_count() or 1) as executor:
+        for start in tqdm(range(0, len(todo), batch_size), desc=desc):
+            chunk = todo[start:start + batch_size]
+            pixels = np.stack(list(executor.map(load_pixels, chunk))).astype(np.float32)
+            features = embed(preprocess_input(pixels), training=False).numpy()
+            cache.add([keys[i] for i in chunk], features)
+
+    return cache.lookup(keys)
+
+def directory_features(split_dir, cache, embed, class_names=CLASS_NAMES, batch_size=64):
+    """(features, labels) for split_dir/<class>/*, keyed by each file's bytes."""
+    paths, labels = [], []
+    for label, name in enumerate(class_names):
+        found = list_images(os.path.join(split_dir, name), DATASET_EXTENSIONS)
+        paths.extend(found)
+        labels.extend([label] * len(found))
+
+    keys = []
+    for path in paths:
+        with open(path, "rb") as f:
+            keys.append(content_key(f.read()))
+
+    features = cached_features(keys, lambda i: _load(paths[i]), cache, embed, batch_size, desc=f"Embedding {split_dir}")
+    return features, np.array(labels, dtype=np.int32)
+
+def packed_features(dataset, cache, embed, batch_size=64):
+    """(features, labels) for a PackedDataset, keyed by each image's pixels."""
+    index = [(shard, i) for shard, images in enumerate(dataset.images) for i in range(len(images))]
+    keys = [content_key(dataset.images[shard][i].tobytes()) for shard, i in index]
+
+    def load_pixels(n):
+        shard, i = index[n]
+        return dataset.images[shard][i]
+
+    features = cached_features(keys, load_pixels, cache, embed, batch_size)
+    return features, np.concatenate(dataset.labels)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Precompute backbone features for the dataset splits')
+    parser.add_argument('dataset', nargs='?', default='./dataset',
+                        help='Dataset folder with <split>/<class>/ subfolders (default: ./dataset)')
+    parser.add_argument('--splits', nargs='+', default=['train', 'validation', 'test'],
+                        help='Splits to embed (default: train validation test)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Feature cache folder (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--batch-size', type=int, default=64, help='Images per backbone call (default: 64)')
+
+    args = parser.parse_args()
+
+    cache = FeatureCache(args.cache_dir)
+    _, embed = embedding_model()
+    for split in args.splits:
+        split_dir = os.path.join(args.dataset, split)
+        if os.path.isdir(split_dir):
+            directory_features(split_dir, cache, embed, batch_size=args.batch_size)
+    print(f"✅ {len(cache)} feature vectors cached in {args.cache_dir}")
@@ -1,53 +1,52 @@
-import os
-from PIL import Image
-import imagehash
-from tqdm import tqdm
+from hashing import compute_hashes, list_images
 
 def compute_image_hashes(folder):
-    hashes = {}
-    for root, _, files in os.walk(folder):
-        for file in tqdm(files, desc=f"Hashing {root}"):
-            if file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                path = os.path.join(root, file)
-                try:
-                    img = Image.open(path)
-                    h = imagehash.average_hash(img)
-                    hashes[path] = str(h)
-                except Exception as e:
-                    print(f"Error with {path}: {e}")
-    return hashes
+    # aHash and pHash come out of the same decode, so both are cached for later runs
+    hashes = compute_hashes(list_images(folder, ('.jpg', '.jpeg', '.png')), desc=f"Hashing {folder}")
+    return {path: f"{values['ahash']:016x}" for path, values in hashes.items()}
 
-# Paths to your datasets
-train_duo = "./dataset/train/duolingo"
-train_not = "./dataset/train/not_duolingo"
-val_duo = "./dataset/validation/duolingo"
-val_not = "./dataset/validation/not_duolingo"
-test_duo = "./dataset/test/duolingo"
-test_not = "./dataset/test/not_duolingo"
-
-# Compute hashes
-train_duo_hashes = compute_image_hashes(train_duo)
-train_not_hashes = compute_image_hashes(train_not)
-val_duo_hashes = compute_image_hashes(val_duo)
-val_not_hashes = compute_image_hashes(val_not)
-test_duo_hashes = compute_image_hashes(test_duo)
-test_not_hashes = compute_image_hashes(test_not)
-
-# Check overlaps
+# Check overlaps (exact aHash matches; leakage_audit.py also finds near-duplicates)
 def find_overlaps(set1, set2, label1, label2):
-    overlaps = set(set1.values()) & set(set2.values())
+    # Invert set1 once so every lookup is a dict hit instead of a rescan of both dicts
+    by_hash = {}
+    for p, v in set1.items():
+        by_hash.setdefault(v, []).append(p)
+    overlaps = {}
+    for p, v in set2.items():
+        if v in by_hash:
+            overlaps.setdefault(v, []).append(p)
     if overlaps:
         print(f"Found {len(overlaps)} overlaps between {label1} and {label2}")
-        for h in overlaps:
-            paths1 = [p for p, v in set1.items() if v == h]
-            paths2 = [p for p, v in set2.items() if v == h]
-            print(f"Hash {h}: {paths1} <-> {paths2}")
+        for h, paths2 in overlaps.items():
+            print(f"Hash {h}: {by_hash[h]} <-> {paths2}")
     else:
         print(f"No overlaps between {label1} and {label2}")
 
-find_overlaps(train_duo_hashes, val_duo_hashes, "Train Duolingo", "Val Duolingo")
-find_overlaps(train_not_hashes, val_not_hashes, "Train Not Duolingo", "Val Not Duolingo")
-find_overlaps(train_duo_hashes, test_duo_hashes, "Train Duolingo", "Test Duolingo")
-find_overlaps(train_not_hashes, test_not_hashes, "Train Not Duolingo", "Test Not Duolingo")
-find_overlaps(val_duo_hashes, test_duo_hashes, "Val Duolingo", "Test Duolingo")
-find_overlaps(val_not_hashes, test_not_hashes, "Val Not Duolingo", "Test Not Duolingo")
\ No newline at end of file
+def main():
+    # Paths to your datasets
+    train_duo = "./dataset/train/duolingo"
+    train_not = "./dataset/train/not_duolingo"
+    val_duo = "./dataset/validation/duolingo"
+    val_not = "./dataset/validation/not_duolingo"
+    test_duo = "./dataset/test/duolingo"
+    test_not = "./dataset/test/not_duolingo"
+
+    # Compute hashes
+    train_duo_hashes = compute_image_hashes(train_duo)
+    train_not_hashes = compute_image_hashes(train_not)
+    val_duo_hashes = compute_image_hashes(val_duo)
+    val_not_hashes = compute_image_hashes(val_not)
+    test_duo_hashes = compute_image_hashes(test_duo)
+    test_not_hashes = compute_image_hashes(test_not)
+
+    find_overlaps(train_duo_hashes, val_duo_hashes, "Train Duolingo", "Val Duolingo")
+    find_overlaps(train_not_hashes, val_not_hashes, "Train Not Duolingo", "Val Not Duolingo")
+    find_overlaps(train_duo_hashes, test_duo_hashes, "Train Duolingo", "Test Duolingo")
+    find_overlaps(train_not_hashes, test_not_hashes, "Train Not Duolingo", "Test Not Duolingo")
+    find_overlaps(val_duo_hashes, test_duo_hashes, "Val Duolingo", "Test Duolingo")
+    find_overlaps(val_not_hashes, test_not_hashes, "Val Not Duolingo", "Test Not Duolingo")
+
+# Hashing uses a process pool, whose workers import this module; under spawn (the macOS default)
+# anything at the top level would run again in every worker
+if __name__ == "__main__":
+    main()
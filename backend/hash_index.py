@@ -0,0 +1,151 @@
+from collections import defaultdict
+from itertools import combinations
+
+def hash_to_int(image_hash):
+    """Pack an imagehash.ImageHash (or its hex string) into a Python int."""
+    return int(str(image_hash), 16)
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class HammingIndex:
+    """
+    Multi-index hashing: find every stored hash within `radius` bits of a query.
+
+    Each hash is split into m substrings and every substring gets its own
+    lookup table. If two hashes differ in at most `radius` bits, then by the
+    pigeonhole principle at least one of their m substrings differs in at most
+    radius // m bits. A query therefore only probes the buckets of those few
+    substring variants and checks the full distance on the candidates found
+    there, instead of comparing against every stored hash.
+
+    m is picked so that each substring is probed at distance 0 or 1, which
+    keeps the number of probes per query around m * (bits / m + 1).
+
+    Args:
+        bits (int): Hash length in bits (64 for the default 8x8 pHash)
+        radius (int): Largest Hamming distance a query should match
+    """
+
+    def __init__(self, bits=64, radius=5):
+        self.bits = bits
+        self.radius = radius
+        self.substrings = min(bits, radius // 2 + 1)
+        self.substring_radius = radius // self.substrings
+
+        # (shift, width) of each substring; the first ones absorb the remainder
+        base, extra = divmod(bits, self.substrings)
+        self._slices = []
+        shift = 0
+        for i in range(self.substrings):
+            width = base + (1 if i < extra else 0)
+            self._slices.append((shift, width))
+            shift += width
+
+        self._tables = [defaultdict(list) for _ in self._slices]
+        self._values = []
+        self._ids = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, item_id, value):
+        position = len(self._values)
+        self._values.append(value)
+        self._ids.append(item_id)
+        for table, (shift, width) in zip(self._tables, self._slices):
+            table[(value >> shift) & ((1 << width) - 1)].append(position)
+
+    def _variants(self, key, width):
+        yield key
+        for flips in range(1, self.substring_radius + 1):
+            for positions in combinations(range(width), flips):
+                variant = key
+                for p in positions:
+                    variant ^= 1 << p
+                yield variant
+
+    def _candidates(self, value):
+        seen = set()
+        for table, (shift, width) in zip(self._tables, self._slices):
+            key = (value >> shift) & ((1 << width) - 1)
+            for variant in self._variants(key, width):
+                for position in table.get(variant, ()):
+                    if position not in seen:
+                        seen.add(position)
+                        yield position
+
+    def query(self, value):
+        """Return [(item_id, distance)] for every stored hash within radius of `value`."""
+        matches = []
+        for position in self._candidates(value):
+            distance = (self._values[position] ^ value).bit_count()
+            if distance <= self.radius:
+                matches.append((self._ids[position], distance))
+        return matches
+
+    def pairs(self):
+        """Yield (id_a, id_b, distance) once for every stored pair within radius."""
+        for position, value in enumerate(self._values):
+            for other in self._candidates(value):
+                if other > position:
+                    distance = (self._values[other] ^ value).bit_count()
+                    if distance <= self.radius:
+                        yield self._ids[position], self._ids[other], distance
+
+
+class UnionFind:
+    """Disjoint sets over arbitrary hashable items, with path halving and union by size."""
+
+    def __init__(self):
+        self._parent = {}
+        self._size = {}
+
+    def find(self, item):
+        if item not in self._parent:
+            self._parent[item] = item
+            self._size[item] = 1
+        while self._parent[item] != item:
+            self._parent[item] = self._parent[self._parent[item]]
+            item = self._parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+        return root_a
+
+    def groups(self):
+        """Return every set as a list of its items."""
+        groups = defaultdict(list)
+        for item in self._parent:
+            groups[self.find(item)].append(item)
+        return list(groups.values())
+
+def group_near_duplicates(hashes, max_distance, bits=64):
+    """
+    Group items whose hashes are within `max_distance` bits, transitively.
+
+    Args:
+        hashes (dict): item -> int hash
+        max_distance (int): Largest Hamming distance that counts as a duplicate
+        bits (int): Hash length in bits
+
+    Returns:
+        list of groups (lists of items) with more than one member
+    """
+    index = HammingIndex(bits, max_distance)
+    sets = UnionFind()
+    for item, value in hashes.items():
+        index.add(item, value)
+        sets.find(item)
+
+    for a, b, _ in index.pairs():
+        sets.union(a, b)
+    return [group for group in sets.groups() if len(group) > 1]
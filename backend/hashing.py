@@ -0,0 +1,156 @@
+import os
+import sqlite3
+from multiprocessing import Pool, cpu_count
+from PIL import Image
+import imagehash
+from tqdm import tqdm
+from hash_index import hash_to_int
+
+# Shared on-disk index of per-file data for the dataset scripts
+DEFAULT_INDEX = "dataset_index.sqlite"
+
+HASH_FUNCTIONS = {
+    "ahash": imagehash.average_hash,
+    "phash": imagehash.phash,
+}
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
+
+# Below this many files a process pool costs more than it saves
+MIN_PARALLEL_FILES = 32
+
+def list_images(folder, extensions=IMAGE_EXTENSIONS):
+    """All image paths under `folder`, recursively, in a stable order."""
+    paths = []
+    for root, _, files in os.walk(folder):
+        for file in files:
+            if file.lower().endswith(extensions):
+                paths.append(os.path.join(root, file))
+    return sorted(paths)
+
+
+class HashCache:
+    """
+    Image hashes stored in SQLite, keyed by (path, hash kind).
+
+    Each row remembers the file size and mtime it was computed from, so a
+    lookup only returns hashes for files that have not changed since.
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (path, kind)
+            )
+        """)
+
+    def lookup(self, stats, kinds):
+        """
+        Return {path: {kind: hex}} for files whose cached hashes are all still valid.
+
+        Args:
+            stats (dict): path -> (size, mtime_ns) as the file is now
+            kinds (list): Hash kinds that must all be present
+        """
+        found = {}
+        query = f"SELECT path, kind, size, mtime_ns, value FROM hashes WHERE kind IN ({','.join('?' * len(kinds))})"
+        for path, kind, size, mtime_ns, value in self.db.execute(query, list(kinds)):
+            if stats.get(path) == (size, mtime_ns):
+                found.setdefault(path, {})[kind] = value
+        return {path: values for path, values in found.items() if len(values) == len(kinds)}
+
+    def store(self, rows):
+        """Store (path, kind, size, mtime_ns, hex) rows, replacing older values."""
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        self.db.close()
+
+def _hash_file(task):
+    """Decode an image once and compute every requested hash on it."""
+    path, hash_types, hash_size = task
+    try:
+        with Image.open(path) as img:
+            # Convert to RGB if needed
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            return path, {name: str(HASH_FUNCTIONS[name](img, hash_size=hash_size)) for name in hash_types}, None
+    except Exception as e:
+        return path, None, str(e)
+
+def _hash_files(tasks, workers):
+    """Yield _hash_file results, on a process pool when there are enough tasks."""
+    if len(tasks) < MIN_PARALLEL_FILES or workers == 1:
+        yield from map(_hash_file, tasks)
+        return
+    with Pool(processes=workers or max(1, cpu_count() - 1)) as pool:
+        yield from pool.imap_unordered(_hash_file, tasks, chunksize=16)
+
+def compute_hashes(paths, hash_types=("ahash", "phash"), hash_size=8, index_path=DEFAULT_INDEX,
+                   workers=None, desc="Hashing images", stats=None):
+    """
+    Hash images, reusing cached values for files that have not changed.
+
+    Only new or modified files are decoded, spread over a process pool, and
+    each one is decoded once no matter how many hash types are requested.
+
+    Args:
+        paths (list): Image paths to hash
+        hash_types (tuple): Any of "ahash", "phash"
+        hash_size (int): Hash size passed to imagehash (8 gives 64-bit hashes)
+        index_path (str): SQLite file holding the cache
+        workers (int): Processes to hash with (default: all cores but one)
+        desc (str): Progress bar label
+        stats (dict): path -> (size, mtime_ns) if already known, e.g. from the catalog
+
+    Returns:
+        dict: path -> {hash type: int}; files that failed to decode are left out
+    """
+    # Cache rows are keyed by absolute path and by type and size, e.g. "phash8"
+    kinds = {name: f"{name}{hash_size}" for name in hash_types}
+    keys = {path: os.path.abspath(path) for path in paths}
+    known, stats = stats or {}, {}
+    for path in paths:
+        if path in known:
+            stats[keys[path]] = known[path]
+        else:
+            st = os.stat(path)
+            stats[keys[path]] = (st.st_size, st.st_mtime_ns)
+
+    cache = HashCache(index_path)
+    valid = cache.lookup(stats, list(kinds.values()))
+    cached = {path: {name: valid[keys[path]][kind] for name, kind in kinds.items()}
+              for path in paths if keys[path] in valid}
+    todo = [(path, tuple(hash_types), hash_size) for path in paths if path not in cached]
+    print(f"{desc}: {len(cached)} cached, {len(todo)} to hash")
+
+    fresh, rows = {}, []
+    try:
+        for path, values, error in tqdm(_hash_files(todo, workers), total=len(todo), desc=desc):
+            if error:
+                print(f"Error with {path}: {error}")
+                continue
+            fresh[path] = values
+            key = keys[path]
+            rows.extend((key, kinds[name], *stats[key], value) for name, value in values.items())
+            # Save progress regularly so an interrupted run is not wasted
+            if len(rows) >= 1000:
+                cache.store(rows)
+                rows = []
+    finally:
+        cache.store(rows)
+        cache.close()
+
+    hashes = {}
+    for path in paths:
+        values = cached.get(path) or fresh.get(path)
+        if values:
+            hashes[path] = {name: hash_to_int(value) for name, value in values.items()}
+    return hashes
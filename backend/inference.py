@@ -0,0 +1,191 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import autotune
+import metrics
+from batcher import MicroBatcher
+from decode import load_image, to_pixels
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from tflite_backend import BACKEND
+
+MODEL_PATH = os.environ.get("MODEL_PATH", "duolingo_detector.tflite")
+
+# Interpreter settings measured on this machine by autotune.py, used as the defaults below when
+# they match this host and model. With AUTOTUNE_ON_START=1 and no such file, a short tuning pass
+# runs before the model is loaded and its result is saved for the next start.
+TUNING_PATH = os.environ.get("TUNING_PATH", autotune.DEFAULT_OUTPUT)
+AUTOTUNE_ON_START = os.environ.get("AUTOTUNE_ON_START", "0") == "1"
+AUTOTUNE_SECONDS = float(os.environ.get("AUTOTUNE_SECONDS", "0.25"))
+
+TUNING = autotune.load_tuning(TUNING_PATH, MODEL_PATH)
+if not TUNING and AUTOTUNE_ON_START:
+    tuning = autotune.tune(MODEL_PATH, seconds=AUTOTUNE_SECONDS, verbose=False)
+    autotune.save(tuning, TUNING_PATH)
+    autotune.report(tuning)
+    TUNING = tuning["settings"]
+
+# One interpreter per core by default; each invoke then uses INTERPRETER_THREADS threads
+POOL_SIZE = int(os.environ.get("INTERPRETER_POOL_SIZE", TUNING.get("pool_size", os.cpu_count() or 1)))
+INTERPRETER_THREADS = int(os.environ.get("INTERPRETER_THREADS", TUNING.get("num_threads", 1)))
+
+# XNNPACK=0 runs the builtin kernels without the default delegate
+XNNPACK = os.environ.get("XNNPACK", "1" if TUNING.get("xnnpack", True) else "0") == "1"
+
+# Batching limits: a request waits at most MAX_BATCH_WAIT_MS for others to join it
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", TUNING.get("max_batch_size", 8)))
+MAX_BATCH_WAIT_MS = float(os.environ.get("MAX_BATCH_WAIT_MS", "5"))
+
+# Threads decoding images for /predict/batch (PIL releases the GIL while decoding)
+DECODE_WORKERS = int(os.environ.get("DECODE_WORKERS", os.cpu_count() or 1))
+
+# Prediction cache budgets; CACHE_PERCEPTUAL=1 adds the pHash tier for re-encoded copies
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+CACHE_PERCEPTUAL = os.environ.get("CACHE_PERCEPTUAL", "0") == "1"
+
+# Load the model in the background at startup; with MODEL_PREWARM=0 it loads on the first request
+MODEL_PREWARM = os.environ.get("MODEL_PREWARM", "1") == "1"
+
+# Folder watched for new *.tflite models, which are loaded in the background and swapped in
+MODELS_DIR = os.environ.get("MODELS_DIR") or None
+MODEL_POLL_SECONDS = float(os.environ.get("MODEL_POLL_SECONDS", "10"))
+
+# With SHADOW_FRACTION > 0 a new model is first shadow-run on that share of batches, and
+# promoted after SHADOW_PROMOTE_AFTER predictions if it agreed on SHADOW_MIN_AGREEMENT of them
+SHADOW_FRACTION = float(os.environ.get("SHADOW_FRACTION", "0"))
+SHADOW_PROMOTE_AFTER = int(os.environ.get("SHADOW_PROMOTE_AFTER", "500"))
+SHADOW_MIN_AGREEMENT = float(os.environ.get("SHADOW_MIN_AGREEMENT", "0.99"))
+
+registry = ModelRegistry(
+    MODEL_PATH,
+    models_dir=MODELS_DIR,
+    pool_size=POOL_SIZE,
+    num_threads=INTERPRETER_THREADS,
+    poll_seconds=MODEL_POLL_SECONDS,
+    shadow_fraction=SHADOW_FRACTION,
+    promote_after=SHADOW_PROMOTE_AFTER,
+    min_agreement=SHADOW_MIN_AGREEMENT,
+    xnnpack=XNNPACK,
+)
+registry.start(prewarm=MODEL_PREWARM)
+
+# One batcher worker per interpreter so every pooled interpreter can be busy at once.
+# Each batch looks up the active model when it runs, so a swap needs no restart.
+batcher = MicroBatcher(
+    registry.run,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_BATCH_WAIT_MS,
+    workers=POOL_SIZE,
+)
+
+cache = PredictionCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, perceptual=CACHE_PERCEPTUAL)
+
+# Confidences from the previous model no longer apply once it is replaced
+registry.on_swap(cache.clear)
+
+def label(confidence):
+    return "duolingo" if confidence > 0.5 else "not_duolingo"
+
+def stats():
+    pool = registry.active
+    return {
+        "batcher": batcher.stats(),
+        "model": registry.stats(),
+        "interpreters": {
+            "backend": BACKEND,
+            "loaded": pool.model_content is not None,
+            "size": pool.size,
+            "available": pool.available(),
+            "num_threads": pool.num_threads,
+            "xnnpack": pool.xnnpack,
+            "tuned": bool(TUNING),
+        },
+        "cache": cache.stats(),
+    }
+
+def decode_pixels(img_bytes):
+    with metrics.timed("decode"):
+        img = load_image(img_bytes)
+    with metrics.timed("resize"):
+        return to_pixels(img)
+
+def _predict(key, load_pixels):
+    confidence = cache.exact.get(key)
+    if confidence is not None:
+        metrics.record_prediction(confidence)
+        return confidence
+
+    pixels = load_pixels()
+    phash = cache.perceptual_key(pixels)
+    if phash is not None:
+        confidence = cache.perceptual.get(phash)
+
+    if confidence is None:
+        # Run inference with TFLite, batched together with concurrent requests
+        confidence = float(batcher.predict(pixels))
+        if phash is not None:
+            cache.perceptual.put(phash, confidence)
+
+    cache.exact.put(key, confidence)
+    metrics.record_prediction(confidence)
+    return confidence
+
+def predict_image(img_bytes):
+    """Return the model confidence for an upload, skipping work for images seen before."""
+    return _predict(cache.content_key(img_bytes), lambda: decode_pixels(img_bytes))
+
+def predict_pixels(pixels):
+    """Return the model confidence for (224, 224, 3) uint8 pixels a client already decoded and resized."""
+    return _predict(cache.content_key(pixels), lambda: pixels)
+
+executor = ThreadPoolExecutor(DECODE_WORKERS, thread_name_prefix="decode")
+
+def _decode_or_error(img_bytes):
+    try:
+        return decode_pixels(img_bytes)
+    except Exception as e:
+        return e
+
+def predict_images(images):
+    """
+    Return one confidence per upload, in order, for a whole batch of uploads.
+
+    Images are decoded in parallel and run through the pool in chunks of
+    MAX_BATCH_SIZE. An image that cannot be decoded gets its exception in
+    place of a confidence so the rest of the batch still succeeds.
+    """
+    results = [None] * len(images)
+    keys = [cache.content_key(img_bytes) for img_bytes in images]
+    pending = []
+    for i, key in enumerate(keys):
+        results[i] = cache.exact.get(key)
+        if results[i] is None:
+            pending.append(i)
+
+    to_run = []
+    for i, pixels in zip(pending, executor.map(_decode_or_error, [images[i] for i in pending])):
+        if isinstance(pixels, Exception):
+            results[i] = pixels
+            continue
+        phash = cache.perceptual_key(pixels)
+        if phash is not None:
+            results[i] = cache.perceptual.get(phash)
+        if results[i] is None:
+            to_run.append((i, pixels, phash))
+
+    chunks = [to_run[start:start + MAX_BATCH_SIZE] for start in range(0, len(to_run), MAX_BATCH_SIZE)]
+    outputs = executor.map(lambda chunk: registry.run(np.stack([pixels for _, pixels, _ in chunk])), chunks)
+    for chunk, confidences in zip(chunks, outputs):
+        for (i, _, phash), confidence in zip(chunk, confidences):
+            results[i] = float(confidence)
+            if phash is not None:
+                cache.perceptual.put(phash, results[i])
+
+    for key, result in zip(keys, results):
+        if isinstance(result, Exception):
+            metrics.record_error("decode")
+        else:
+            cache.exact.put(key, result)
+            metrics.record_prediction(result)
+    return results
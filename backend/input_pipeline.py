@@ -0,0 +1,87 @@
+import os
+import random
+import tensorflow as tf
+from hashing import list_images
+from pack_dataset import CLASS_NAMES, DATASET_EXTENSIONS, IMAGE_SIZE
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+def list_files(split_dir, class_names=CLASS_NAMES):
+    """Return (paths, labels) for split_dir/<class>/*, labelled by position in class_names."""
+    paths, labels = [], []
+    for label, name in enumerate(class_names):
+        found = list_images(os.path.join(split_dir, name), DATASET_EXTENSIONS)
+        paths.extend(found)
+        labels.extend([label] * len(found))
+    return paths, labels
+
+def cache_for(cache, split):
+    """Map a --cache option ("memory" or a folder) to the build_dataset cache for one split."""
+    if cache is None or cache == "memory":
+        return cache
+    return os.path.join(cache, split)
+
+def _decode(path, label):
+    # Decoded and resized the same way as image_dataset_from_directory, but kept
+    # as uint8 so a cache holds a quarter of the bytes
+    img = tf.image.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    img = tf.image.resize(img, IMAGE_SIZE, method="bilinear")
+    return tf.saturate_cast(img, tf.uint8), label
+
+def _normalize(x, y):
+    return tf.keras.applications.mobilenet_v2.preprocess_input(tf.cast(x, tf.float32)), y
+
+def build_dataset(source, batch_size=32, shuffle=False, cache=None, shuffle_buffer=1024, seed=None,
+                  class_names=CLASS_NAMES):
+    """
+    Batched, normalized (images, labels) pipeline for training or evaluation.
+
+    Files are read and decoded on parallel map calls, normalization runs per
+    batch, and the next batches are prefetched while the model runs.
+
+    Args:
+        source (str | PackedDataset | AugmentedStream): Split folder with <class>/
+            subfolders, packed shards, or an on-the-fly augmentation stream
+        batch_size (int): Images per batch
+        shuffle (bool): Reshuffle every epoch
+        cache (str): None, "memory", or a file prefix for tf.data's on-disk cache
+            of decoded images (folders only)
+        shuffle_buffer (int): Images held for shuffling when cached; uncached
+            folders shuffle the full file list instead
+        seed (int): Shuffle seed
+        class_names (list): Class subfolders, in label order
+
+    Returns:
+        tf.data.Dataset with a `file_paths` attribute listing images in unshuffled order
+    """
+    if not isinstance(source, str):
+        # Already batched and prefetched by the shard reader or augmentation stream
+        ds = source.as_tf_dataset(batch_size, shuffle, seed)
+        file_paths = source.file_paths
+    else:
+        file_paths, labels = list_files(source, class_names)
+        order = list(range(len(file_paths)))
+        if shuffle and cache is not None:
+            # Files are listed class by class, so mix them once before caching; the
+            # buffer shuffle after the cache only reorders images that are close together
+            random.Random(seed).shuffle(order)
+        # Explicit dtypes so an empty split still maps through _decode
+        ds = tf.data.Dataset.from_tensor_slices((tf.constant([file_paths[i] for i in order], dtype=tf.string),
+                                                 tf.constant([labels[i] for i in order], dtype=tf.int32)))
+        if shuffle and cache is None and file_paths:
+            # Shuffling paths is free; decoded images would have to sit in the buffer
+            ds = ds.shuffle(len(file_paths), seed=seed, reshuffle_each_iteration=True)
+        ds = ds.map(_decode, num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+        if cache is not None:
+            if cache == "memory":
+                ds = ds.cache()
+            else:
+                os.makedirs(os.path.dirname(cache) or ".", exist_ok=True)
+                ds = ds.cache(cache)
+            if shuffle:
+                ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size)
+
+    ds = ds.map(_normalize, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
+    ds.file_paths = file_paths
+    return ds
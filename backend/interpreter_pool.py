@@ -0,0 +1,140 @@
+import threading
+from contextlib import contextmanager
+from queue import Queue
+import numpy as np
+import metrics
+from decode import IMG_SIZE, normalize_into
+from tflite_backend import Interpreter, OpResolverType
+
+
+class PooledInterpreter:
+    """
+    One interpreter plus the batch size its tensors are currently allocated for.
+
+    Float models get MobileNetV2-normalized input. Fully quantized models
+    (see quantize.py) take uint8 pixels as they are, and their output is
+    dequantized back to a confidence in [0, 1].
+
+    The XNNPACK delegate is applied by default; with xnnpack=False the
+    interpreter runs the builtin kernels only.
+    """
+
+    def __init__(self, model_content, num_threads=None, xnnpack=True):
+        kwargs = {} if xnnpack else {"experimental_op_resolver_type": OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES}
+        self.interpreter = Interpreter(model_content=model_content, num_threads=num_threads, **kwargs)
+        self.interpreter.allocate_tensors()
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self.input_index = input_details["index"]
+        self.output_index = output_details["index"]
+        self.input_dtype = input_details["dtype"]
+        self.input_quantization = input_details["quantization"]
+        self.output_quantization = output_details["quantization"] if output_details["dtype"] != np.float32 else None
+        self.batch_size = 1
+
+    def _fill_input(self, pixels, input_buffer):
+        if self.input_dtype == np.float32:
+            normalize_into(pixels, input_buffer)
+            return
+        scale, zero_point = self.input_quantization
+        if self.input_dtype == np.uint8 and (scale, zero_point) == (1.0, 0):
+            # The model was calibrated on raw pixels, so they are already its input
+            np.copyto(input_buffer, pixels)
+        else:
+            info = np.iinfo(self.input_dtype)
+            quantized = np.round(pixels / np.float32(scale)) + zero_point
+            np.copyto(input_buffer, np.clip(quantized, info.min, info.max), casting="unsafe")
+
+    def run(self, pixels):
+        """Run one invoke on a (n, 224, 224, 3) uint8 batch and return n confidences."""
+        # Reallocating is expensive, so only resize when the batch size changes
+        if len(pixels) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, pixels.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(pixels)
+
+        # Write straight into the interpreter's own input buffer instead of
+        # building a copy for set_tensor. The view must be dropped before
+        # invoke() or the interpreter refuses to run.
+        with metrics.timed("normalize"):
+            input_buffer = self.interpreter.tensor(self.input_index)()
+            self._fill_input(pixels, input_buffer)
+            del input_buffer
+
+        with metrics.timed("invoke"):
+            self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output_index)[:, 0]
+        if self.output_quantization is not None:
+            scale, zero_point = self.output_quantization
+            output = (output.astype(np.float32) - zero_point) * np.float32(scale)
+        return output
+
+
+class InterpreterPool:
+    """
+    A fixed set of TFLite interpreters that threads check out one at a time.
+
+    A single interpreter is not safe to use from several threads, so each
+    caller borrows one for the duration of its invoke and returns it after.
+    The model file is read once and every interpreter is built on top of
+    that same buffer, so extra interpreters only cost their tensor arenas.
+
+    Nothing is loaded until the first checkout or an explicit `warmup()`.
+
+    Args:
+        model_path (str): Path to the .tflite model
+        size (int): Number of interpreters in the pool
+        num_threads (int): Threads each interpreter may use for one invoke
+        xnnpack (bool): Apply the XNNPACK delegate
+    """
+
+    def __init__(self, model_path, size=1, num_threads=None, xnnpack=True):
+        self.model_path = model_path
+        self.size = max(1, size)
+        self.num_threads = num_threads
+        self.xnnpack = xnnpack
+        self.model_content = None
+        self._idle = Queue()
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Read the model and build the interpreters, once."""
+        with self._load_lock:
+            if self.model_content is not None:
+                return
+            with open(self.model_path, "rb") as f:
+                # Interpreters keep a reference to this buffer instead of copying it
+                model_content = f.read()
+            for _ in range(self.size):
+                self._idle.put(PooledInterpreter(model_content, self.num_threads, self.xnnpack))
+            self.model_content = model_content
+
+    def warmup(self):
+        """Load the model and run a dummy invoke on every interpreter."""
+        self.load()
+        dummy = np.zeros((1, *IMG_SIZE, 3), dtype=np.uint8)
+        borrowed = [self._idle.get() for _ in range(self.size)]
+        try:
+            for pooled in borrowed:
+                pooled.run(dummy)
+        finally:
+            for pooled in borrowed:
+                self._idle.put(pooled)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow an interpreter, blocking until one is free."""
+        if self.model_content is None:
+            self.load()
+        pooled = self._idle.get(timeout=timeout)
+        try:
+            yield pooled
+        finally:
+            self._idle.put(pooled)
+
+    def run(self, batch):
+        with self.checkout() as pooled:
+            return pooled.run(batch)
+
+    def available(self):
+        return self._idle.qsize()
@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+from collections import Counter
+from hash_index import HammingIndex
+from catalog import Catalog
+from hashing import DEFAULT_INDEX, compute_hashes
+
+SPLITS = ("train", "validation", "test")
+
+def collect_images(dataset_dir, splits=SPLITS, index_path=DEFAULT_INDEX):
+    """
+    Return ([(split, label, path)], path -> (size, mtime_ns)) for every image under dataset_dir/<split>/<label>/.
+
+    The dataset is synced into the catalog once and the images are then
+    selected from it by split, rather than walking every split folder.
+    """
+    catalog = Catalog(index_path)
+    try:
+        catalog.sync(dataset_dir)
+        entries = [e for e in catalog.files(under=dataset_dir, split=splits) if e.label is not None]
+    finally:
+        catalog.close()
+    return [(e.split, e.label, e.path) for e in entries], Catalog.stats(entries)
+
+def audit(dataset_dir, splits=SPLITS, hash_type="phash", hash_size=8, max_distance=5):
+    """
+    Find near-duplicate images that appear in more than one split.
+
+    Each split gets its own multi-index Hamming index, and every image of an
+    earlier split is queried against the indexes of the later splits, so no
+    split is ever compared pair by pair. All label combinations are checked,
+    so the same image filed under different labels shows up too.
+
+    Returns:
+        dict: JSON-serializable report with per-combination counts and every pair
+    """
+    images, stats = collect_images(dataset_dir, splits)
+    hashes = compute_hashes([path for _, _, path in images], hash_types=(hash_type,), hash_size=hash_size,
+                            stats=stats)
+
+    bits = hash_size * hash_size
+    indexes = {split: HammingIndex(bits, max_distance) for split in splits}
+    labels = {}
+    for split, label, path in images:
+        if path in hashes:
+            indexes[split].add(path, hashes[path][hash_type])
+            labels[path] = (split, label)
+
+    pairs = []
+    counts = Counter()
+    for i, split in enumerate(splits):
+        for later in splits[i + 1:]:
+            for split_a, label_a, path_a in images:
+                if split_a != split or path_a not in hashes:
+                    continue
+                for path_b, distance in indexes[later].query(hashes[path_a][hash_type]):
+                    _, label_b = labels[path_b]
+                    counts[f"{split}/{label_a} <-> {later}/{label_b}"] += 1
+                    pairs.append({
+                        "a": {"split": split, "label": label_a, "path": path_a},
+                        "b": {"split": later, "label": label_b, "path": path_b},
+                        "distance": distance,
+                    })
+
+    pairs.sort(key=lambda p: (p["distance"], p["a"]["path"], p["b"]["path"]))
+    return {
+        "dataset": dataset_dir,
+        "hash": hash_type,
+        "hash_size": hash_size,
+        "max_distance": max_distance,
+        "images": len(labels),
+        "total_pairs": len(pairs),
+        "label_conflicts": sum(1 for p in pairs if p["a"]["label"] != p["b"]["label"]),
+        "counts": dict(sorted(counts.items())),
+        "pairs": pairs,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Find near-duplicate images leaking across dataset splits')
+    parser.add_argument('dataset', nargs='?', default='./dataset',
+                        help='Dataset folder with <split>/<label>/ subfolders (default: ./dataset)')
+    parser.add_argument('--splits', nargs='+', default=list(SPLITS),
+                        help='Split folders to compare (default: train validation test)')
+    parser.add_argument('--hash', choices=('ahash', 'phash'), default='phash',
+                        help='Hash to compare (default: phash)')
+    parser.add_argument('--hash-size', type=int, default=8, help='Hash size (default: 8)')
+    parser.add_argument('--max-distance', type=int, default=5,
+                        help='Maximum number of differing hash bits to count as a leak (default: 5)')
+    parser.add_argument('--report', default='leakage_report.json', help='Where to write the JSON report')
+    parser.add_argument('--fail-on-leak', action='store_true', help='Exit with status 1 if any leak is found')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dataset):
+        print(f"Error: Dataset folder '{args.dataset}' does not exist.")
+        exit(1)
+
+    report = audit(args.dataset, tuple(args.splits), args.hash, args.hash_size, args.max_distance)
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if report["total_pairs"]:
+        print(f"Found {report['total_pairs']} near-duplicate pairs across splits "
+              f"({report['label_conflicts']} with conflicting labels):")
+        for combination, count in report["counts"].items():
+            print(f" - {combination}: {count}")
+    else:
+        print(f"No leaks found among {report['images']} images")
+    print(f"Report written to {args.report}")
+
+    if args.fail_on_leak and report["total_pairs"]:
+        exit(1)
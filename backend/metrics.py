@@ -0,0 +1,52 @@
+"""
+Prometheus metrics for the inference service, served on /metrics.
+
+Every hook is a perf_counter pair plus one histogram observe, so they are
+cheap enough to leave on in production.
+"""
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+STAGES = ("upload_read", "decode", "resize", "normalize", "invoke", "serialize")
+
+# 0.5ms to 5s; decode of a 12MP photo and a batched invoke both land mid-range
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGE_SECONDS = Histogram("duo_stage_seconds", "Time spent in each stage of a prediction",
+                          ["stage"], buckets=LATENCY_BUCKETS)
+PREDICTIONS = Counter("duo_predictions_total", "Predictions served, by predicted class", ["prediction"])
+CONFIDENCE = Histogram("duo_prediction_confidence", "Model confidence of served predictions",
+                       buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0))
+ERRORS = Counter("duo_errors_total", "Rejected or failed images, by reason", ["reason"])
+BATCH_SIZE = Histogram("duo_batch_size", "Images per batched invoke", buckets=(1, 2, 4, 8, 16, 32, 64))
+QUEUE_WAIT = Histogram("duo_queue_wait_seconds", "Time a request waited for its batch to start",
+                       buckets=LATENCY_BUCKETS)
+MODEL_SWAPS = Counter("duo_model_swaps_total", "Times a newly loaded model became the active one")
+SHADOW_SECONDS = Histogram("duo_shadow_invoke_seconds", "Invoke time of the active and candidate models on shadowed batches",
+                           ["model"], buckets=LATENCY_BUCKETS)
+SHADOW_COMPARISONS = Counter("duo_shadow_predictions_total",
+                             "Shadowed predictions, by whether the candidate agreed with the active model", ["result"])
+
+# Resolve the labelled children once instead of on every observation
+_stage_histograms = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+_prediction_counters = {name: PREDICTIONS.labels(name) for name in ("duolingo", "not_duolingo")}
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stage_histograms[stage].observe(time.perf_counter() - start)
+
+def record_prediction(confidence):
+    _prediction_counters["duolingo" if confidence > 0.5 else "not_duolingo"].inc()
+    CONFIDENCE.observe(confidence)
+
+def record_error(reason):
+    ERRORS.labels(reason).inc()
+
+def render():
+    """Return (body, content type) for a /metrics response."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,224 @@
+import glob
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import metrics
+from interpreter_pool import InterpreterPool
+
+# Shadow batches allowed to queue up before further samples are skipped
+SHADOW_MAX_PENDING = 4
+
+def model_version(path):
+    """Identify a model file by its path and modification time."""
+    return os.path.abspath(path), os.stat(path).st_mtime_ns
+
+
+class ModelRegistry:
+    """
+    The model currently serving traffic, replaced in place when a newer one appears.
+
+    A watcher thread polls `models_dir` for the newest *.tflite file. A new
+    file is loaded into its own interpreter pool and warmed up in the
+    background while the current pool keeps serving. The swap itself is a
+    single reference assignment: batches already running finish on the old
+    pool, and later batches pick up the new one, so no request is dropped.
+
+    With `shadow_fraction` set, a new model first becomes a candidate instead.
+    That fraction of batches is also run on the candidate, off the request
+    path, and its latency and agreement with the active model are recorded.
+    The candidate is promoted once it has agreed on at least `min_agreement`
+    of `promote_after` shadowed predictions.
+
+    Write models into the folder atomically (write elsewhere, then rename) so
+    the watcher never sees a half-copied file.
+
+    Args:
+        model_path (str): Model to serve until a newer one is found
+        models_dir (str): Folder to watch, or None to serve model_path only
+        pool_size (int): Interpreters per model
+        num_threads (int): Threads per interpreter
+        xnnpack (bool): Apply the XNNPACK delegate
+        poll_seconds (float): How often to check models_dir
+        shadow_fraction (float): Share of batches to shadow-run on a candidate; 0 swaps new models in directly
+        promote_after (int): Shadowed predictions needed before promotion; 0 never promotes
+        min_agreement (float): Agreement rate the candidate needs to be promoted
+    """
+
+    def __init__(self, model_path, models_dir=None, pool_size=1, num_threads=None, poll_seconds=10.0,
+                 shadow_fraction=0.0, promote_after=500, min_agreement=0.99, xnnpack=True):
+        self.models_dir = models_dir
+        self.pool_size = pool_size
+        self.num_threads = num_threads
+        self.xnnpack = xnnpack
+        self.poll_seconds = poll_seconds
+        self.shadow_fraction = shadow_fraction
+        self.promote_after = promote_after
+        self.min_agreement = min_agreement
+
+        newest = self.newest()
+        if newest is not None:
+            model_path = newest
+        self.active = InterpreterPool(model_path, pool_size, num_threads, xnnpack)
+        self.version = model_version(model_path)
+        self.candidate = None
+        self.candidate_version = None
+        self.swaps = 0
+
+        self._seen = {self.version}
+        self._lock = threading.RLock()
+        self._swap_listeners = []
+        self._shadow_executor = ThreadPoolExecutor(1, thread_name_prefix="shadow")
+        self._shadow_slots = threading.BoundedSemaphore(SHADOW_MAX_PENDING)
+        self._reset_shadow()
+
+    def _reset_shadow(self):
+        self._shadow = {"predictions": 0, "agreements": 0, "abs_diff_sum": 0.0,
+                        "active_seconds": 0.0, "candidate_seconds": 0.0, "batches": 0, "errors": 0}
+
+    def on_swap(self, callback):
+        """Call `callback()` after every model swap, e.g. to clear cached predictions."""
+        self._swap_listeners.append(callback)
+
+    def start(self, prewarm=True):
+        """Warm up the active model and start watching models_dir, both in the background."""
+        if prewarm:
+            threading.Thread(target=self._warmup_active, name="prewarm", daemon=True).start()
+        if self.models_dir:
+            threading.Thread(target=self._watch, name="model-watcher", daemon=True).start()
+
+    def _warmup_active(self):
+        start = time.perf_counter()
+        self.active.warmup()
+        print(f"✅ Loaded {os.path.basename(self.active.model_path)} ({self.pool_size} interpreters x "
+              f"{self.num_threads} threads) in {time.perf_counter() - start:.2f}s")
+
+    def newest(self):
+        """Path of the most recently modified *.tflite in models_dir, if any."""
+        if not self.models_dir:
+            return None
+        paths = glob.glob(os.path.join(self.models_dir, "*.tflite"))
+        return max(paths, key=os.path.getmtime) if paths else None
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Model watcher error: {e}")
+
+    def poll(self):
+        """Load the newest model in models_dir if it has not been seen yet. Returns True if one was loaded."""
+        path = self.newest()
+        if path is None:
+            return False
+        version = model_version(path)
+        if version in self._seen:
+            return False
+        # Marked before loading so a broken file is not retried on every poll
+        self._seen.add(version)
+
+        start = time.perf_counter()
+        pool = InterpreterPool(path, self.pool_size, self.num_threads, self.xnnpack)
+        try:
+            pool.warmup()
+        except Exception as e:
+            print(f"❌ Could not load {path}: {e}")
+            return False
+        print(f"✅ Loaded {os.path.basename(path)} in {time.perf_counter() - start:.2f}s")
+
+        with self._lock:
+            if self.shadow_fraction > 0:
+                self.candidate, self.candidate_version = pool, version
+                self._reset_shadow()
+                print(f"Shadowing {os.path.basename(path)} on {self.shadow_fraction:.0%} of batches")
+            else:
+                self._swap(pool, version)
+        return True
+
+    def _swap(self, pool, version):
+        with self._lock:
+            self.active, self.version = pool, version
+            if self.candidate is pool:
+                self.candidate = self.candidate_version = None
+            self.swaps += 1
+        metrics.MODEL_SWAPS.inc()
+        for callback in self._swap_listeners:
+            callback()
+        print(f"✅ Now serving {os.path.basename(version[0])}")
+
+    def promote(self):
+        """Make the current candidate the active model."""
+        with self._lock:
+            if self.candidate is not None:
+                self._swap(self.candidate, self.candidate_version)
+
+    def run(self, batch):
+        """Run a batch on the active model, and sometimes on the candidate as well."""
+        active, candidate = self.active, self.candidate
+        start = time.perf_counter()
+        confidences = active.run(batch)
+        elapsed = time.perf_counter() - start
+
+        if candidate is not None and random.random() < self.shadow_fraction \
+                and self._shadow_slots.acquire(blocking=False):
+            self._shadow_executor.submit(self._run_shadow, candidate, batch, np.array(confidences), elapsed)
+        return confidences
+
+    def _run_shadow(self, candidate, batch, expected, active_seconds):
+        try:
+            start = time.perf_counter()
+            confidences = candidate.run(batch)
+            candidate_seconds = time.perf_counter() - start
+        except Exception as e:
+            with self._lock:
+                self._shadow["errors"] += 1
+            print(f"❌ Shadow model failed: {e}")
+            return
+        finally:
+            self._shadow_slots.release()
+
+        agreed = (confidences > 0.5) == (expected > 0.5)
+        metrics.SHADOW_SECONDS.labels("active").observe(active_seconds)
+        metrics.SHADOW_SECONDS.labels("candidate").observe(candidate_seconds)
+        metrics.SHADOW_COMPARISONS.labels("agree").inc(int(agreed.sum()))
+        metrics.SHADOW_COMPARISONS.labels("disagree").inc(int((~agreed).sum()))
+
+        with self._lock:
+            if candidate is not self.candidate:
+                return
+            shadow = self._shadow
+            shadow["batches"] += 1
+            shadow["predictions"] += len(agreed)
+            shadow["agreements"] += int(agreed.sum())
+            shadow["abs_diff_sum"] += float(np.abs(confidences - expected).sum())
+            shadow["active_seconds"] += active_seconds
+            shadow["candidate_seconds"] += candidate_seconds
+
+            if self.promote_after and shadow["predictions"] >= self.promote_after:
+                if shadow["agreements"] / shadow["predictions"] >= self.min_agreement:
+                    self.promote()
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "model": self.version[0],
+                "swaps": self.swaps,
+                "candidate": self.candidate_version[0] if self.candidate_version else None,
+            }
+            if self.candidate is not None:
+                shadow = self._shadow
+                predictions, batches = shadow["predictions"], shadow["batches"]
+                stats["shadow"] = {
+                    "fraction": self.shadow_fraction,
+                    "predictions": predictions,
+                    "errors": shadow["errors"],
+                    "agreement": shadow["agreements"] / predictions if predictions else None,
+                    "mean_abs_diff": shadow["abs_diff_sum"] / predictions if predictions else None,
+                    "active_ms": shadow["active_seconds"] * 1000 / batches if batches else None,
+                    "candidate_ms": shadow["candidate_seconds"] * 1000 / batches if batches else None,
+                }
+            return stats
@@ -1,20 +1,44 @@
+import argparse
 import os
 import random
-import shutil
-
-def move_random_images_flat(source, dest, percent=10):
-    images = [f for f in os.listdir(source) 
-              if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-    
-    num_to_move = len(images) * percent // 100
-    selected = random.sample(images, num_to_move)
-    
-    os.makedirs(dest, exist_ok=True)
-    
-    for img in selected:
-        shutil.move(os.path.join(source, img), 
-                   os.path.join(dest, img))
-    
-    print("Moved", num_to_move, "images to", dest)
-
-move_random_images_flat("./raw_data/train/not_duolingo", "./raw_data/train/not_duolingo_extra", 50)
\ No newline at end of file
+from catalog import Catalog
+from hashing import DEFAULT_INDEX
+
+def move_random_images_flat(source, dest, percent=10, root="./raw_data", index_path=DEFAULT_INDEX, seed=None):
+    """
+    Move a random percent of the images directly inside source into dest.
+
+    The images are picked from the catalog, after a quick sync of source as
+    part of root (or of whatever synced root contains source, or of source
+    itself), and moved in one batch that updates the catalog in a single
+    transaction.
+    """
+    catalog = Catalog(index_path)
+    try:
+        catalog.sync(source, quick=True, root=root)
+        images = [entry for entry in catalog.files(directory=source)
+                  if entry.path.lower().endswith(('.png', '.jpg', '.jpeg'))]
+
+        num_to_move = len(images) * percent // 100
+        selected = random.Random(seed).sample(images, num_to_move)
+
+        errors = catalog.move([(entry, os.path.join(dest, os.path.basename(entry.path))) for entry in selected])
+    finally:
+        catalog.close()
+
+    for path, error in errors:
+        print(f"Could not move {path}: {error}")
+    print("Moved", num_to_move - len(errors), "images to", dest)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Move a random share of a folder\'s images to another folder')
+    parser.add_argument('source', nargs='?', default='./raw_data/train/not_duolingo', help='Folder to move images from')
+    parser.add_argument('dest', nargs='?', default='./raw_data/train/not_duolingo_extra', help='Folder to move them to')
+    parser.add_argument('--percent', type=int, default=50, help='Share of images to move (default: 50)')
+    parser.add_argument('--root', default='./raw_data',
+                        help='Dataset root the folders belong to, kept in the catalog (default: ./raw_data)')
+    parser.add_argument('--seed', type=int, help='Seed for a reproducible selection')
+
+    args = parser.parse_args()
+
+    move_random_images_flat(args.source, args.dest, args.percent, args.root, seed=args.seed)
@@ -0,0 +1,153 @@
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+from hashing import list_images
+
+CLASS_NAMES = ["not_duolingo", "duolingo"]
+IMAGE_SIZE = (224, 224)
+
+# The files image_dataset_from_directory accepts; tf.image.decode_image cannot read TIFF or WebP
+DATASET_EXTENSIONS = ('.bmp', '.gif', '.jpeg', '.jpg', '.png')
+
+# 2048 images of 224x224x3 bytes is ~300MB per shard
+SHARD_SIZE = 2048
+
+def _load(path):
+    img = Image.open(path).convert("RGB")
+    if img.size != IMAGE_SIZE:
+        # Same interpolation image_dataset_from_directory uses
+        img = img.resize(IMAGE_SIZE, Image.BILINEAR)
+    return np.asarray(img)
+
+def pack_split(split_dir, output_dir, class_names=CLASS_NAMES, shard_size=SHARD_SIZE, workers=None):
+    """
+    Pack split_dir/<class>/* into uint8 image shards plus label arrays.
+
+    Images are decoded once here; training then reads raw pixels straight
+    from memory-mapped .npy files instead of opening and decoding thousands
+    of small files every epoch.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    samples = [(path, label) for label, name in enumerate(class_names)
+               for path in list_images(os.path.join(split_dir, name), DATASET_EXTENSIONS)]
+
+    shards = []
+    with ThreadPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        for shard_index, start in enumerate(range(0, len(samples), shard_size)):
+            chunk = samples[start:start + shard_size]
+            prefix = f"shard_{shard_index:05d}"
+            # open_memmap writes straight into the .npy file, so a shard never sits in RAM
+            images = np.lib.format.open_memmap(os.path.join(output_dir, f"{prefix}_images.npy"), mode="w+",
+                                               dtype=np.uint8, shape=(len(chunk), *IMAGE_SIZE, 3))
+            labels = np.array([label for _, label in chunk], dtype=np.int32)
+
+            pixels = executor.map(_load, [path for path, _ in chunk])
+            for i, array in enumerate(tqdm(pixels, total=len(chunk), desc=f"Packing {prefix}")):
+                images[i] = array
+            images.flush()
+            del images
+            np.save(os.path.join(output_dir, f"{prefix}_labels.npy"), labels)
+
+            shards.append({
+                "images": f"{prefix}_images.npy",
+                "labels": f"{prefix}_labels.npy",
+                "count": len(chunk),
+                "paths": [path for path, _ in chunk],
+            })
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump({"class_names": class_names, "image_size": IMAGE_SIZE, "shards": shards}, f, indent=1)
+    print(f"Packed {len(samples)} images from {split_dir} into {len(shards)} shards in {output_dir}")
+
+
+class PackedDataset:
+    """
+    Memory-mapped view over the shards written by pack_split().
+
+    Unshuffled batches are slices of the mapped files, so they are read
+    without copying. Shuffled batches gather a fresh random permutation every
+    epoch, sorted within each batch so reads stay as sequential as possible.
+    """
+
+    def __init__(self, packed_dir):
+        with open(os.path.join(packed_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.class_names = manifest["class_names"]
+        self.images = [np.load(os.path.join(packed_dir, s["images"]), mmap_mode="r") for s in manifest["shards"]]
+        self.labels = [np.load(os.path.join(packed_dir, s["labels"])) for s in manifest["shards"]]
+        self.file_paths = [path for s in manifest["shards"] for path in s["paths"]]
+        self._offsets = np.cumsum([0] + [len(labels) for labels in self.labels])
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def __getitem__(self, index):
+        """(image, label) at a position in unshuffled order."""
+        shard = int(np.searchsorted(self._offsets, index, side="right")) - 1
+        local = index - self._offsets[shard]
+        return self.images[shard][local], self.labels[shard][local]
+
+    def batches(self, batch_size=32, shuffle=False, seed=None):
+        """Yield (images, labels) batches as uint8 and int32 numpy arrays."""
+        if not shuffle:
+            for images, labels in zip(self.images, self.labels):
+                for start in range(0, len(labels), batch_size):
+                    yield images[start:start + batch_size], labels[start:start + batch_size]
+            return
+
+        order = np.random.default_rng(seed).permutation(len(self))
+        for start in range(0, len(order), batch_size):
+            batch = np.sort(order[start:start + batch_size])
+            shard_of = np.searchsorted(self._offsets, batch, side="right") - 1
+            images, labels = [], []
+            for shard in np.unique(shard_of):
+                local = batch[shard_of == shard] - self._offsets[shard]
+                images.append(self.images[shard][local])
+                labels.append(self.labels[shard][local])
+            yield np.concatenate(images), np.concatenate(labels)
+
+    def as_tf_dataset(self, batch_size=32, shuffle=False, seed=None):
+        """
+        A tf.data pipeline over the shards, reshuffled every epoch and prefetched.
+
+        Images come out as float32 in [0, 255], the same as
+        image_dataset_from_directory, so the usual preprocess_input applies.
+        """
+        import tensorflow as tf
+
+        epochs = itertools.count()
+        base_seed = seed if seed is not None else np.random.SeedSequence().entropy % 2**32
+
+        def generator():
+            yield from self.batches(batch_size, shuffle, base_seed + next(epochs))
+
+        ds = tf.data.Dataset.from_generator(generator, output_signature=(
+            tf.TensorSpec((None, *IMAGE_SIZE, 3), tf.uint8),
+            tf.TensorSpec((None,), tf.int32),
+        ))
+        ds = ds.map(lambda x, y: (tf.cast(x, tf.float32), y), num_parallel_calls=tf.data.AUTOTUNE)
+        return ds.prefetch(tf.data.AUTOTUNE)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pack a preprocessed dataset into memory-mappable shards')
+    parser.add_argument('dataset', nargs='?', default='./dataset',
+                        help='Dataset folder with <split>/<class>/ subfolders (default: ./dataset)')
+    parser.add_argument('output', nargs='?', default='./packed', help='Where to write the shards (default: ./packed)')
+    parser.add_argument('--splits', nargs='+', default=['train', 'validation', 'test'],
+                        help='Splits to pack (default: train validation test)')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE,
+                        help=f'Images per shard (default: {SHARD_SIZE})')
+
+    args = parser.parse_args()
+
+    for split in args.splits:
+        split_dir = os.path.join(args.dataset, split)
+        if not os.path.isdir(split_dir):
+            print(f"Skipping {split}: '{split_dir}' does not exist")
+            continue
+        pack_split(split_dir, os.path.join(args.output, split), shard_size=args.shard_size)
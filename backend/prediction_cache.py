@@ -0,0 +1,113 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# Rough per-entry cost of the dict node, key object and boxed float
+ENTRY_OVERHEAD = 120
+
+
+class LRUCache:
+    """
+    Thread-safe LRU map bounded by both an entry count and an estimated byte size.
+
+    Args:
+        max_entries (int): Evict once more than this many entries are stored
+        max_bytes (int): Evict once the estimated size exceeds this many bytes
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._entries[key] = value
+                return
+            self._entries[key] = value
+            self.bytes += len(key) + ENTRY_OVERHEAD
+
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                old_key, _ = self._entries.popitem(last=False)
+                self.bytes -= len(old_key) + ENTRY_OVERHEAD
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class PredictionCache:
+    """
+    Cache of model confidences for uploads that have been seen before.
+
+    The exact tier is keyed by a hash of the raw upload bytes, so a repeat
+    upload skips both decoding and inference. The optional perceptual tier is
+    keyed by the pHash of the decoded image (the same hash del_dups.py uses),
+    so a re-encoded or re-saved copy of a known image still skips inference.
+
+    Args:
+        max_entries (int): Entry budget per tier
+        max_bytes (int): Estimated byte budget per tier
+        perceptual (bool): Also keep the pHash tier (needs imagehash)
+        hash_size (int): pHash size for the perceptual tier
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=8 * 1024 * 1024, perceptual=False, hash_size=8):
+        self.exact = LRUCache(max_entries, max_bytes)
+        self.perceptual = LRUCache(max_entries, max_bytes) if perceptual else None
+        self.hash_size = hash_size
+
+    @staticmethod
+    def content_key(img_bytes):
+        return hashlib.blake2b(img_bytes, digest_size=16).digest()
+
+    def perceptual_key(self, pixels):
+        """pHash of decoded (h, w, 3) uint8 pixels, or None when the tier is off."""
+        if self.perceptual is None:
+            return None
+        import imagehash
+        return str(imagehash.phash(Image.fromarray(pixels), hash_size=self.hash_size))
+
+    def clear(self):
+        """Drop every cached confidence, e.g. after the model changes."""
+        self.exact.clear()
+        if self.perceptual is not None:
+            self.perceptual.clear()
+
+    def stats(self):
+        return {
+            "exact": self.exact.stats(),
+            "perceptual": self.perceptual.stats() if self.perceptual is not None else None,
+        }
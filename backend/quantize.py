@@ -0,0 +1,109 @@
+import argparse
+import os
+import random
+import time
+import numpy as np
+import tensorflow as tf
+from evaluation import StreamingEvaluator
+from input_pipeline import list_files
+from interpreter_pool import PooledInterpreter
+from pack_dataset import _load
+
+def wrap_for_uint8(model):
+    """Put the [-1, 1] MobileNetV2 scaling inside the model so it takes raw 0-255 pixels."""
+    inputs = tf.keras.Input(shape=(224, 224, 3))
+    x = tf.keras.layers.Rescaling(1 / 127.5, offset=-1)(inputs)
+    return tf.keras.Model(inputs, model(x))
+
+def representative_paths(train_dir, samples, seed=0):
+    paths, _ = list_files(train_dir)
+    random.Random(seed).shuffle(paths)
+    return paths[:samples]
+
+def convert_int8(model, calibration_paths):
+    """Convert to a fully integer model with uint8 input and output."""
+    def representative_dataset():
+        # A full 0-255 ramp first pins the input range, so the input quantization
+        # is exactly scale 1 / zero point 0 and raw pixels can be fed unchanged
+        yield [np.tile(np.arange(256, dtype=np.float32), 224 * 224 * 3 // 256 + 1)[:224 * 224 * 3].reshape(1, 224, 224, 3)]
+        for path in calibration_paths:
+            yield [_load(path).astype(np.float32)[None]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(wrap_for_uint8(model))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.uint8
+    converter.inference_output_type = tf.uint8
+    return converter.convert()
+
+def latency_ms(model_content, runs, num_threads):
+    """Median single-image invoke time, input writing included."""
+    pooled = PooledInterpreter(model_content, num_threads)
+    pixels = np.random.default_rng(0).integers(0, 256, (1, 224, 224, 3), dtype=np.uint8)
+    pooled.run(pixels)  # warm up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pooled.run(pixels)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+def evaluate_tflite(model_content, test_dir, batch_size=32):
+    """Accuracy and F1 of a .tflite model over the test split, in one pass."""
+    pooled = PooledInterpreter(model_content)
+    paths, labels = list_files(test_dir)
+    evaluator = StreamingEvaluator()
+    for start in range(0, len(paths), batch_size):
+        pixels = np.stack([_load(path) for path in paths[start:start + batch_size]])
+        evaluator.update(labels[start:start + batch_size], pooled.run(pixels))
+    return evaluator
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build a full-int8 model and publish it only if accuracy holds')
+    parser.add_argument('--model', default='duolingo_detector.keras', help='Trained Keras model (default: duolingo_detector.keras)')
+    parser.add_argument('--baseline', default='duolingo_detector.tflite',
+                        help='Current float model to compare against (default: duolingo_detector.tflite)')
+    parser.add_argument('--output', default='duolingo_detector_int8.tflite',
+                        help='Where to write the int8 model if it passes (default: duolingo_detector_int8.tflite)')
+    parser.add_argument('--train-dir', default='./dataset/train', help='Calibration images (default: ./dataset/train)')
+    parser.add_argument('--test-dir', default='./dataset/test', help='Evaluation images (default: ./dataset/test)')
+    parser.add_argument('--samples', type=int, default=300, help='Calibration images to sample (default: 300)')
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.01,
+                        help='Largest allowed test accuracy drop versus the baseline (default: 0.01)')
+    parser.add_argument('--runs', type=int, default=50, help='Timed invokes per model (default: 50)')
+    parser.add_argument('--threads', type=int, default=1, help='Interpreter threads for the latency test (default: 1)')
+
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    calibration = representative_paths(args.train_dir, args.samples)
+    print(f"Calibrating on {len(calibration)} images from {args.train_dir}")
+    candidate = convert_int8(model, calibration)
+
+    with open(args.baseline, "rb") as f:
+        baseline = f.read()
+
+    results = {}
+    for name, content in (("float", baseline), ("int8", candidate)):
+        evaluator = evaluate_tflite(content, args.test_dir)
+        results[name] = {
+            "size_mb": len(content) / 1e6,
+            "latency_ms": latency_ms(content, args.runs, args.threads),
+            "accuracy": evaluator.accuracy,
+            "f1": evaluator.report()["Duolingo"]["f1-score"],
+        }
+
+    print(f"{'model':<6} {'size MB':>8} {'latency ms':>11} {'accuracy':>9} {'F1':>6}")
+    for name, r in results.items():
+        print(f"{name:<6} {r['size_mb']:>8.2f} {r['latency_ms']:>11.2f} {r['accuracy']:>9.4f} {r['f1']:>6.4f}")
+
+    drop = results["float"]["accuracy"] - results["int8"]["accuracy"]
+    if drop > args.max_accuracy_drop:
+        print(f"❌ Accuracy dropped by {drop:.4f} (limit {args.max_accuracy_drop}); not publishing")
+        exit(1)
+
+    with open(args.output + ".tmp", "wb") as f:
+        f.write(candidate)
+    os.replace(args.output + ".tmp", args.output)
+    print(f"✅ Int8 model saved to {args.output}")
@@ -0,0 +1,125 @@
+"""
+Compact pre-decoded upload format for /predict.
+
+Instead of an encoded photo, a client can send the model input itself: the
+image already resized to 224x224 RGB, as raw uint8 pixels behind a 12 byte
+header, optionally zlib-compressed. The server then skips decoding and
+resizing entirely and the upload is ~150KB at most, whatever the photo's size.
+
+Layout (little endian):
+    magic     4s  b"DUOT"
+    version   B   1
+    flags     B   FLAG_ZLIB when the pixels are zlib-compressed
+    height    H   224
+    width     H   224
+    channels  H   3
+    pixels        height * width * channels bytes, row-major RGB
+
+Send it as the request body with Content-Type: application/x-duo-tensor.
+See client.py for a reference client.
+"""
+import struct
+import zlib
+import numpy as np
+from decode import IMG_SIZE
+from uploads import CHUNK_SIZE, UploadRejected
+
+CONTENT_TYPE = "application/x-duo-tensor"
+
+MAGIC = b"DUOT"
+VERSION = 1
+FLAG_ZLIB = 0x01
+HEADER = struct.Struct("<4sBBHHH")
+
+SHAPE = (*IMG_SIZE, 3)
+PIXEL_BYTES = SHAPE[0] * SHAPE[1] * SHAPE[2]
+
+# Incompressible pixels grow slightly under zlib; anything past this is not a valid payload
+MAX_PAYLOAD_BYTES = HEADER.size + PIXEL_BYTES + PIXEL_BYTES // 1000 + 64
+
+def encode(pixels, compress=True, level=6):
+    """Pack (224, 224, 3) uint8 pixels into a payload."""
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    if pixels.shape != SHAPE:
+        raise ValueError(f"Expected pixels of shape {SHAPE}, got {pixels.shape}")
+    body = zlib.compress(pixels, level) if compress else pixels.tobytes()
+    return HEADER.pack(MAGIC, VERSION, FLAG_ZLIB if compress else 0, *SHAPE) + body
+
+def parse_header(head):
+    """Validate the header at the start of a payload and return its flags."""
+    if len(head) < HEADER.size:
+        raise UploadRejected("Tensor payload is shorter than its header", status=400)
+    magic, version, flags, *shape = HEADER.unpack_from(head)
+    if magic != MAGIC:
+        raise UploadRejected("Not a tensor payload", status=415)
+    if version != VERSION:
+        raise UploadRejected(f"Unsupported tensor payload version {version}", status=415)
+    if flags & ~FLAG_ZLIB:
+        raise UploadRejected(f"Unsupported tensor payload flags {flags:#x}", status=415)
+    if tuple(shape) != SHAPE:
+        raise UploadRejected(f"Tensor must be {'x'.join(map(str, SHAPE))}, got {'x'.join(map(str, shape))}",
+                             status=400)
+    return flags
+
+def decode(payload):
+    """
+    Validate a payload and return its pixels as a read-only (224, 224, 3) uint8 array.
+
+    Uncompressed pixels are a view over `payload` itself, so nothing is
+    copied before they are batched. Compressed pixels are inflated into a
+    buffer of exactly PIXEL_BYTES; a stream that inflates to any other size
+    is rejected without inflating more than that.
+    """
+    flags = parse_header(payload)
+    body = memoryview(payload)[HEADER.size:]
+    if flags & FLAG_ZLIB:
+        inflater = zlib.decompressobj()
+        try:
+            raw = inflater.decompress(body, PIXEL_BYTES + 1)
+        except zlib.error as e:
+            raise UploadRejected(f"Corrupt tensor payload: {e}", status=400)
+        if len(raw) != PIXEL_BYTES or not inflater.eof or inflater.unused_data:
+            raise UploadRejected(f"Tensor payload does not inflate to {PIXEL_BYTES} bytes", status=400)
+    else:
+        raw = body
+        if len(raw) != PIXEL_BYTES:
+            raise UploadRejected(f"Tensor payload has {len(raw)} pixel bytes, expected {PIXEL_BYTES}", status=400)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(SHAPE)
+
+
+class PayloadReader:
+    """Collect a payload chunk by chunk, rejecting a bad header or oversized body early."""
+
+    def __init__(self, max_bytes=MAX_PAYLOAD_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._chunks = []
+        self._checked = False
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadRejected(f"Tensor payload is larger than {self.max_bytes} bytes")
+        self._chunks.append(chunk)
+        if not self._checked and self.size >= HEADER.size:
+            parse_header(b"".join(self._chunks))
+            self._checked = True
+
+    def finish(self):
+        return decode(b"".join(self._chunks))
+
+
+def read_payload(stream, max_bytes=MAX_PAYLOAD_BYTES):
+    """Read and decode a payload from a file-like request body."""
+    reader = PayloadReader(max_bytes)
+    while chunk := stream.read(CHUNK_SIZE):
+        reader.feed(chunk)
+    return reader.finish()
+
+async def read_payload_async(chunks, max_bytes=MAX_PAYLOAD_BYTES):
+    """read_payload() for an async iterator of body chunks such as Starlette's request.stream()."""
+    reader = PayloadReader(max_bytes)
+    async for chunk in chunks:
+        if chunk:
+            reader.feed(chunk)
+    return reader.finish()
@@ -1,64 +1,53 @@
-import tensorflow as tf
+import argparse
 from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image_dataset_from_directory
 import numpy as np
-from sklearn.metrics import classification_report
+from PIL import Image
 from utils import preprocess_images
+from pack_dataset import PackedDataset
+from input_pipeline import build_dataset, cache_for
+from evaluation import evaluate
 import matplotlib.pyplot as plt
 
-preprocess_images("./raw_data/test/duolingo", "./dataset/test/duolingo")
-preprocess_images("./raw_data/test/not_duolingo", "./dataset/test/not_duolingo")
+parser = argparse.ArgumentParser(description='Evaluate the Duolingo classifier on the test split')
+parser.add_argument('--packed', help='Read the test split from shards written by pack_dataset.py (e.g. ./packed)')
+parser.add_argument('--cache',
+                    help='Cache decoded images after the first pass: "memory" or a folder such as ./tf_cache')
+args = parser.parse_args()
+
+if not args.packed:
+    preprocess_images("./raw_data/test/duolingo", "./dataset/test/duolingo")
+    preprocess_images("./raw_data/test/not_duolingo", "./dataset/test/not_duolingo")
 
 model = load_model("duolingo_detector.keras")
 print("✅ Model Loaded!")
 
-test_ds = image_dataset_from_directory(
-    "./dataset/test",
-    image_size=(224, 224),
-    batch_size=32,
-    shuffle=False,
-    class_names = ["not_duolingo", "duolingo"]
-)
-
-# Normalize pixel values
-test_ds = test_ds.map(lambda x, y: (tf.keras.applications.mobilenet_v2.preprocess_input(x), y))
+test_source = PackedDataset(f"{args.packed}/test") if args.packed else "./dataset/test"
+test_ds = build_dataset(test_source, batch_size=32, cache=cache_for(args.cache, "test"))
 
-test_loss, test_accuracy = model.evaluate(test_ds)
-print(f"📊 Test Accuracy: {test_accuracy * 100:.2f}%")
-print(f"📉 Test Loss: {test_loss:.4f}")
-
-# Get true labels and predictions
-images, y_true = [], []
-for x, y in test_ds:
-    images.append(x.numpy())
-    y_true.append(y.numpy())
-images = np.concatenate(images)
-y_true = np.concatenate(y_true)
-y_pred = model.predict(test_ds)
-y_pred = np.round(y_pred).flatten()  # Convert probabilities to 0/1 labels
+# One pass: loss, confusion matrix and report are accumulated batch by batch,
+# and only the indices of misclassified images are kept
+evaluator = evaluate(lambda x: model.predict_on_batch(x)[:, 0], test_ds)
+print(f"📊 Test Accuracy: {evaluator.accuracy * 100:.2f}%")
+print(f"📉 Test Loss: {evaluator.loss:.4f}")
 
 # Generate a classification report
-print(classification_report(y_true, y_pred, target_names=["Not Duolingo", "Duolingo"]))
+print(evaluator.format_report())
+
+def load_test_image(idx):
+    """Reload one test image for display, from the shards or from its file."""
+    if args.packed:
+        return test_source[idx][0]
+    return np.asarray(Image.open(test_ds.file_paths[idx]).convert("RGB").resize((224, 224)))
 
 # Visualize misclassifications
-def visualize_misclassifications(images, y_true, y_pred):
-    false_positives = []
-    false_negatives = []
-    
-    for i in range(len(y_true)):
-        if y_true[i] == 0 and y_pred[i] == 1:  # False Positive
-            false_positives.append(i)
-        elif y_true[i] == 1 and y_pred[i] == 0:  # False Negative
-            false_negatives.append(i)
-    
+def visualize_misclassifications(false_positives, false_negatives):
     # Plot False Positives
     if false_positives:
         print(f"False Positives (Predicted Duolingo, Actually Not Duolingo): {len(false_positives)}")
         plt.figure(figsize=(15, 5))
         for j, idx in enumerate(false_positives[:5]):  # Show up to 5 examples
             plt.subplot(1, 5, j+1)
-            img = images[idx] * 0.5 + 0.5  # Denormalize from [-1, 1] to [0, 1] for display
-            plt.imshow(img)
+            plt.imshow(load_test_image(idx))
             plt.title(f"FP #{idx}")
             plt.axis('off')
         plt.show()
@@ -69,10 +58,12 @@ def visualize_misclassifications(images, y_true, y_pred):
         plt.figure(figsize=(15, 5))
         for j, idx in enumerate(false_negatives[:5]):  # Show up to 5 examples
             plt.subplot(1, 5, j+1)
-            img = images[idx] * 0.5 + 0.5  # Denormalize
-            plt.imshow(img)
+            plt.imshow(load_test_image(idx))
             plt.title(f"FN #{idx}")
             plt.axis('off')
         plt.show()
 
-visualize_misclassifications(images, y_true, y_pred)
+for idx in evaluator.false_positives + evaluator.false_negatives:
+    print(f"Misclassified #{idx}: {test_ds.file_paths[idx]}")
+
+visualize_misclassifications(evaluator.false_positives, evaluator.false_negatives)
@@ -0,0 +1,30 @@
+"""
+Pick the lightest TFLite interpreter package that is installed.
+
+Serving only needs the interpreter, and importing all of TensorFlow for it
+costs seconds and hundreds of MB at startup. ai-edge-litert (the current
+name of tflite-runtime) and tflite-runtime are tried first; TensorFlow is
+only imported when neither is installed. Set TFLITE_BACKEND to force one.
+"""
+import importlib
+import os
+
+BACKENDS = ("ai_edge_litert", "tflite_runtime", "tensorflow")
+
+def _load(name):
+    if name == "tensorflow":
+        import tensorflow as tf
+        return tf.lite.Interpreter, tf.lite.experimental.OpResolverType
+    module = importlib.import_module(f"{name}.interpreter")
+    return module.Interpreter, module.OpResolverType
+
+def _select():
+    requested = os.environ.get("TFLITE_BACKEND")
+    for name in [requested] if requested else BACKENDS:
+        try:
+            return (name, *_load(name))
+        except ImportError:
+            continue
+    raise ImportError("No TFLite interpreter found; install ai-edge-litert, tflite-runtime or tensorflow")
+
+BACKEND, Interpreter, OpResolverType = _select()
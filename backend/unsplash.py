@@ -1,40 +1,91 @@
-import requests
+import argparse
 import os
-import time
+from downloader import Downloader, TokenBucket
 
 # 🔹 Unsplash API Key (Get it from https://unsplash.com/developers)
-ACCESS_KEY = "MwuS_LDLl04kK33ROtUu5rnmBda8gdRlJzQVJ02XiOA"
+ACCESS_KEY = os.environ.get("UNSPLASH_ACCESS_KEY", "MwuS_LDLl04kK33ROtUu5rnmBda8gdRlJzQVJ02XiOA")
 
 # 🔹 Folder to store images
 OUTPUT_DIR = "dataset/train/not_duolingo"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # 🔹 Number of images to download
 NUM_IMAGES = 1000
 
-# 🔹 Unsplash API endpoint for random images
-URL = f"https://api.unsplash.com/photos/random?count=1&client_id={ACCESS_KEY}"
+# 🔹 Unsplash API root; point it at a local stand-in server to test without the real API
+API_URL = os.environ.get("UNSPLASH_API_URL", "https://api.unsplash.com")
 
-def download_images(num_images):
-    for i in range(num_images):
-        try:
-            response = requests.get(URL).json()
-            if isinstance(response, list):  # Sometimes Unsplash returns a list
-                response = response[0]
+# 🔹 Most photos one /photos/random call returns
+MAX_PER_CALL = 30
+
+# 🔹 Give up after this many metadata calls in a row fail
+MAX_API_FAILURES = 5
+
+# 🔹 Give up after this many rounds in a row add no new images (all duplicates or failed downloads)
+MAX_STALLED_ROUNDS = 5
 
-            img_url = response["urls"]["regular"]
-            img_data = requests.get(img_url).content
+# 🔹 Demo apps get 50 API requests per hour (production apps get 5000)
+API_REQUESTS_PER_HOUR = 50
 
-            with open(f"{OUTPUT_DIR}/image_{i}.jpg", "wb") as f:
-                f.write(img_data)
+def download_images(num_images, output_dir=OUTPUT_DIR, api_url=API_URL, workers=8,
+                    requests_per_hour=API_REQUESTS_PER_HOUR):
+    """
+    Download random Unsplash photos until num_images are on disk.
 
-            print(f"✅ Downloaded {i+1}/{num_images}")
+    Metadata comes MAX_PER_CALL photos per API call, rate limited with a
+    token bucket. The images themselves are fetched concurrently from the
+    CDN, which the API limit does not cover. Progress is kept in the
+    manifest, so a rerun only fetches what is still missing.
+    """
+    downloader = Downloader(output_dir, workers=workers, prefix="unsplash_")
+    api_limiter = TokenBucket(requests_per_hour / 3600, capacity=requests_per_hour)
 
-            time.sleep(1)  # Prevent API rate limits
+    def report(entry):
+        if entry["status"] == "failed":
+            print(f"⚠️ Skipping {entry['url']}: {entry.get('error')}")
 
+    failures = stalled = 0
+    while (have := downloader.manifest.count("ok")) < num_images:
+        print(f"✅ Downloaded {have}/{num_images}")
+        count = min(MAX_PER_CALL, num_images - have)
+        try:
+            photos = downloader.get_json(f"{api_url}/photos/random", api_limiter,
+                                         params={"count": count, "client_id": ACCESS_KEY})
         except Exception as e:
-            print(f"⚠️ Skipping {i+1}: {e}")
-            time.sleep(2)  # Wait before retrying
+            failures += 1
+            print(f"⚠️ Metadata request failed: {e}")
+            if failures >= MAX_API_FAILURES:
+                print(f"❌ Giving up after {failures} failed metadata requests")
+                break
+            continue
+        failures = 0
+        if isinstance(photos, dict):  # A single photo comes back as an object
+            photos = [photos]
+
+        urls = [photo["urls"]["regular"] for photo in photos]
+        urls = [url for url in urls if not downloader.manifest.done(url)]
+        downloader.download_all(urls, on_result=report)
+
+        if downloader.manifest.count("ok") > have:
+            stalled = 0
+            continue
+        stalled += 1
+        if stalled >= MAX_STALLED_ROUNDS:
+            print(f"❌ Giving up after {stalled} rounds without a new image")
+            break
+
+    print(f"✅ Downloaded {downloader.manifest.count('ok')}/{num_images} "
+          f"({downloader.manifest.count('duplicate')} duplicates skipped)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Download random Unsplash photos as not_duolingo examples')
+    parser.add_argument('--count', type=int, default=NUM_IMAGES, help=f'Images to end up with (default: {NUM_IMAGES})')
+    parser.add_argument('--output', default=OUTPUT_DIR, help=f'Output folder (default: {OUTPUT_DIR})')
+    parser.add_argument('--api-url', default=API_URL, help=f'API root (default: {API_URL})')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent image downloads (default: 8)')
+    parser.add_argument('--requests-per-hour', type=float, default=API_REQUESTS_PER_HOUR,
+                        help=f'API rate limit (default: {API_REQUESTS_PER_HOUR})')
+
+    args = parser.parse_args()
 
-# 🔹 Start Downloading!
-download_images(NUM_IMAGES)
+    # 🔹 Start Downloading!
+    download_images(args.count, args.output, args.api_url, args.workers, args.requests_per_hour)
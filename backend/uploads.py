@@ -0,0 +1,229 @@
+import io
+import math
+import os
+import struct
+import tarfile
+import zipfile
+from contextlib import contextmanager
+from PIL import Image, UnidentifiedImageError
+from decode import draft_scale
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
+ALLOWED_FORMATS = ("JPEG", "PNG", "GIF", "BMP", "TIFF", "WEBP", "MPO")
+
+# Limits per image: encoded size, and pixels the decoder will actually allocate
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", str(25_000_000)))
+MAX_ARCHIVE_BYTES = int(os.environ.get("MAX_ARCHIVE_BYTES", str(200 * 1024 * 1024)))
+
+# Limits on what an archive may expand to, checked from declared sizes before anything is extracted
+MAX_BATCH_FILES = int(os.environ.get("MAX_BATCH_FILES", "256"))
+MAX_ARCHIVE_ENTRIES = int(os.environ.get("MAX_ARCHIVE_ENTRIES", "4096"))
+MAX_ARCHIVE_EXTRACTED_BYTES = int(os.environ.get("MAX_ARCHIVE_EXTRACTED_BYTES", str(MAX_ARCHIVE_BYTES)))
+
+# Room for the multipart boundaries and headers around a single upload
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Largest request bodies accepted before anything is parsed: one image, or one batch
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD
+MAX_BATCH_REQUEST_BYTES = MAX_ARCHIVE_BYTES + MULTIPART_OVERHEAD
+
+CHUNK_SIZE = 64 * 1024
+# Give up on finding the image header after this much data (large EXIF/ICC blocks come first)
+MAX_HEADER_BYTES = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """An upload that failed validation, with the HTTP status to answer with."""
+
+    def __init__(self, message, status=413):
+        super().__init__(message)
+        self.status = status
+
+
+def _webp_size(head):
+    """
+    (width, height) from the first chunk of a RIFF WebP, or None until enough bytes are in.
+
+    PIL can only open a WebP once it has the whole file, but the size sits in
+    the VP8/VP8L/VP8X chunk header within the first 30 bytes.
+    """
+    if len(head) < 30:
+        return None
+    chunk, data = head[12:16], head[20:30]
+    if chunk == b"VP8 " and data[3:6] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[6:10])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and data[0] == 0x2F:
+        bits = int.from_bytes(data[1:5], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(data[4:7], "little") + 1, int.from_bytes(data[7:10], "little") + 1
+    raise UploadRejected("Not a supported image file", status=415)
+
+
+class UploadReader:
+    """
+    Collect an upload chunk by chunk, rejecting it as soon as it breaks a limit.
+
+    The image header (format, width, height) is parsed from the first chunks,
+    so an oversized image or a decompression bomb is refused before the rest
+    of the body is read or anything is decoded. JPEGs are judged by the size
+    they will be decoded at after draft(), so a large photo is downsized
+    rather than rejected.
+    """
+
+    def __init__(self, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS):
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.size = 0
+        self.header = None
+        self._chunks = []
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadRejected(f"Image is larger than {self.max_bytes} bytes")
+        self._chunks.append(chunk)
+
+        if self.header is None:
+            self._check_header(final=False)
+
+    def finish(self):
+        if self.header is None:
+            self._check_header(final=True)
+        return b"".join(self._chunks)
+
+    def _check_header(self, final):
+        head = b"".join(self._chunks)
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            size = _webp_size(head)
+            if size is None:
+                if final:
+                    raise UploadRejected("Not a supported image file", status=415)
+                return
+            self.header = ("WEBP", *size)
+        else:
+            try:
+                with Image.open(io.BytesIO(head)) as img:
+                    self.header = (img.format, *img.size)
+            except Image.DecompressionBombError:
+                raise UploadRejected(f"Image has more than {self.max_pixels} pixels")
+            except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+                if final or len(head) >= MAX_HEADER_BYTES:
+                    raise UploadRejected("Not a supported image file", status=415)
+                return
+
+        fmt, width, height = self.header
+        if fmt not in ALLOWED_FORMATS:
+            raise UploadRejected(f"Unsupported image format {fmt}", status=415)
+
+        scale = draft_scale(width, height) if fmt in ("JPEG", "MPO") else 1
+        if math.ceil(width / scale) * math.ceil(height / scale) > self.max_pixels:
+            raise UploadRejected(f"Image is {width}x{height}, more than {self.max_pixels} pixels")
+
+
+def read_upload(stream, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS):
+    """Read and validate an image from a file-like object without over-reading."""
+    reader = UploadReader(max_bytes, max_pixels)
+    while chunk := stream.read(CHUNK_SIZE):
+        reader.feed(chunk)
+    return reader.finish()
+
+async def read_upload_async(upload, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS):
+    """read_upload() for an async file such as Starlette's UploadFile."""
+    reader = UploadReader(max_bytes, max_pixels)
+    while chunk := await upload.read(CHUNK_SIZE):
+        reader.feed(chunk)
+    return reader.finish()
+
+def check_image(img_bytes, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS):
+    """Validate image bytes that are already in memory."""
+    reader = UploadReader(max_bytes, max_pixels)
+    for start in range(0, len(img_bytes), CHUNK_SIZE):
+        reader.feed(img_bytes[start:start + CHUNK_SIZE])
+    return reader.finish()
+
+def _is_image_name(name):
+    base = os.path.basename(name)
+    # Skip macOS resource forks and other hidden files archivers like to add
+    return not base.startswith('.') and '__MACOSX' not in name and base.lower().endswith(IMAGE_EXTENSIONS)
+
+def _zip_entry_count(data):
+    """Entry count from the end of central directory record, read before ZipFile parses every entry."""
+    end = data.rfind(b"PK\x05\x06", max(0, len(data) - 0xFFFF - 22))
+    return struct.unpack_from("<H", data, end + 10)[0] if 0 <= end <= len(data) - 22 else None
+
+def _admit(entries, max_images, max_bytes):
+    """
+    Keep the images among (name, size, is_file, read) entries, enforcing the archive limits.
+
+    Only declared sizes are summed, so nothing is extracted before the whole
+    archive is known to fit. Tar entries are listed lazily and a compressed
+    tar stops being decompressed as soon as a limit is passed.
+    """
+    images, count, total = [], 0, 0
+    for name, size, is_file, read in entries:
+        count += 1
+        if count > MAX_ARCHIVE_ENTRIES:
+            raise UploadRejected(f"Archive has more than {MAX_ARCHIVE_ENTRIES} entries")
+        if not is_file:
+            continue
+        total += size
+        if total > max_bytes:
+            raise UploadRejected(f"Archive contents add up to more than {max_bytes} bytes")
+        if _is_image_name(name):
+            images.append((name, size, read))
+            if len(images) > max_images:
+                raise UploadRejected(f"Archive holds more images than the batch has room for ({max_images})")
+    return images
+
+@contextmanager
+def _archive_members(data, max_images, max_bytes):
+    """[(name, size, read)] for every image inside a zip or tar archive, readable while the context is open."""
+    if zipfile.is_zipfile(io.BytesIO(data)):
+        count = _zip_entry_count(data)
+        # 0xFFFF means the real count is in a zip64 record, which no archive under the limits needs
+        if count is not None and (count == 0xFFFF or count > MAX_ARCHIVE_ENTRIES):
+            raise UploadRejected(f"Archive has more than {MAX_ARCHIVE_ENTRIES} entries")
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            yield _admit(((info.filename, info.file_size, not info.is_dir(), lambda info=info: archive.read(info))
+                          for info in archive.infolist()), max_images, max_bytes)
+        return
+
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as archive:
+        yield _admit(((member.name, member.size, member.isfile(),
+                       lambda member=member: archive.extractfile(member).read())
+                      for member in archive), max_images, max_bytes)
+
+def read_archive(stream, max_images=MAX_BATCH_FILES, max_bytes=MAX_ARCHIVE_EXTRACTED_BYTES):
+    """
+    Read a zip/tar upload and return (name, bytes or UploadRejected) per image.
+
+    The archive as a whole is refused with UploadRejected (413) if it holds
+    more than max_images images or its declared contents add up to more than
+    max_bytes, before any member is extracted. Members over MAX_UPLOAD_BYTES
+    are rejected from their declared size without being extracted. An
+    archive that cannot be read at all raises UploadRejected (400).
+    """
+    chunks, size = [], 0
+    while chunk := stream.read(CHUNK_SIZE):
+        size += len(chunk)
+        if size > MAX_ARCHIVE_BYTES:
+            raise UploadRejected(f"Archive is larger than {MAX_ARCHIVE_BYTES} bytes")
+        chunks.append(chunk)
+    data = b"".join(chunks)
+
+    images = []
+    try:
+        with _archive_members(data, max_images, max_bytes) as members:
+            for name, size, read in members:
+                try:
+                    if size > MAX_UPLOAD_BYTES:
+                        raise UploadRejected(f"Image is larger than {MAX_UPLOAD_BYTES} bytes")
+                    images.append((name, check_image(read())))
+                except UploadRejected as e:
+                    images.append((name, e))
+    except (zipfile.BadZipFile, tarfile.TarError):
+        raise UploadRejected("Archive must be a zip or tar file", status=400)
+    return images
@@ -1,16 +1,72 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
 # Resize all images to 224x224 (for MobileNetV2)
 TARGET_SIZE = (224, 224)
 
-def preprocess_images(input_dir, output_dir):
+# JPEG outputs are written once at this fixed quality; PNG/BMP/TIFF are lossless
+JPEG_QUALITY = 95
+
+def _preprocess_one(src, dst):
+    try:
+        img = Image.open(src).convert("RGB")
+        img = img.resize(TARGET_SIZE)
+        ext = os.path.splitext(dst)[1].lower()
+        if ext in ('.jpg', '.jpeg'):
+            img.save(dst, quality=JPEG_QUALITY, subsampling=0)
+        elif ext == '.webp':
+            img.save(dst, lossless=True)
+        else:
+            img.save(dst)
+
+        # Give the output the source's mtime so a changed source is always detected,
+        # even when it is replaced by a file with an older timestamp
+        st = os.stat(src)
+        os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+        return None
+    except Exception as e:
+        return str(e)
+
+def preprocess_images(input_dir, output_dir, workers=None, force=False):
+    """
+    Resize every image in input_dir into output_dir, skipping ones already done.
+
+    An output counts as up to date when it exists and carries the same mtime
+    as its source. The rest are processed on a thread pool (PIL releases the
+    GIL while decoding, resizing and encoding).
+
+    Args:
+        input_dir (str): Folder of raw images
+        output_dir (str): Folder to write resized images to
+        workers (int): Threads to use (default: one per core)
+        force (bool): Reprocess everything, even up-to-date outputs
+
+    Returns:
+        dict: "processed" and "skipped" lists of file names, "failed" name -> error
+    """
     os.makedirs(output_dir, exist_ok=True)
-    for img_name in os.listdir(input_dir):
-        img_path = os.path.join(input_dir, img_name)
-        try:
-            img = Image.open(img_path).convert("RGB")
-            img = img.resize(TARGET_SIZE)
-            img.save(os.path.join(output_dir, img_name))
-        except Exception as e:
-            print(f"Skipping {img_name}: {e}")
\ No newline at end of file
+    todo, skipped = [], []
+    for img_name in sorted(os.listdir(input_dir)):
+        src = os.path.join(input_dir, img_name)
+        dst = os.path.join(output_dir, img_name)
+        if not os.path.isfile(src):
+            continue
+        if not force and os.path.exists(dst) and os.stat(dst).st_mtime_ns == os.stat(src).st_mtime_ns:
+            skipped.append(img_name)
+        else:
+            todo.append(img_name)
+
+    processed, failed = [], {}
+    with ThreadPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        errors = executor.map(lambda name: _preprocess_one(os.path.join(input_dir, name),
+                                                           os.path.join(output_dir, name)), todo)
+        for img_name, error in zip(todo, errors):
+            if error:
+                failed[img_name] = error
+                print(f"Skipping {img_name}: {error}")
+            else:
+                processed.append(img_name)
+
+    print(f"{output_dir}: {len(processed)} processed, {len(skipped)} up to date, {len(failed)} failed")
+    return {"processed": processed, "skipped": skipped, "failed": failed}